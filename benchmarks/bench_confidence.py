@@ -0,0 +1,118 @@
+# benchmarks/bench_confidence.py
+"""
+Micro-benchmark: per-pair calculate_confidence vs batched score_candidates.
+
+    python -m benchmarks.bench_confidence [--searches 200] [--candidates 50]
+
+Also checks that both paths return identical scores and breakdowns
+against a verbatim copy of the original difflib implementation.
+"""
+import argparse
+import difflib
+import random
+import time
+
+from utils import helpers
+from utils import confidence
+from utils.confidence import calculate_confidence, score_candidates, duration_match, WEIGHTS
+
+WORDS = ("love", "night", "blue", "heart", "road", "fire", "dream", "city", "rain", "gold",
+         "light", "home", "wild", "river", "star", "ghost", "summer", "dance", "echo", "stone")
+
+
+def _reference_similarity(a, b):
+    """The pre-batching implementation, kept verbatim for parity checks"""
+    def norm(s):
+        if not s:
+            return ""
+        return s.lower().strip().replace(" - remastered", "").replace(" (remaster)", "")
+    return int(difflib.SequenceMatcher(None, norm(a), norm(b)).ratio() * 100)
+
+
+def reference_confidence(mp3, apple):
+    scores = {
+        'duration': duration_match(mp3['duration_ms'], apple['duration_ms']),
+        'title': _reference_similarity(mp3['title'], apple['title']),
+        'artist': _reference_similarity(mp3['artist'], apple['artist']),
+        'album': _reference_similarity(mp3['album'], apple['album']),
+    }
+    return round(sum(scores[k] * WEIGHTS[k] for k in WEIGHTS)), scores
+
+
+def _phrase(rng, n):
+    return " ".join(rng.choice(WORDS).title() for _ in range(n))
+
+
+def make_search(rng, n_candidates):
+    """One MP3 record plus a realistic candidate list (shared artists/albums)"""
+    mp3 = {
+        'title': _phrase(rng, 3), 'artist': _phrase(rng, 2), 'album': _phrase(rng, 2),
+        'duration_ms': rng.randint(120000, 360000),
+    }
+    artists = [mp3['artist']] + [_phrase(rng, 2) for _ in range(3)]
+    albums = [mp3['album'], mp3['album'] + " - Remastered"] + [_phrase(rng, 2) for _ in range(4)]
+    candidates = []
+    for _ in range(n_candidates):
+        candidates.append({
+            'title': rng.choice([mp3['title'], mp3['title'] + " (Live)", _phrase(rng, 3)]),
+            'artist': rng.choice(artists),
+            'album': rng.choice(albums),
+            'duration_ms': mp3['duration_ms'] + rng.randint(-20000, 20000),
+        })
+    return mp3, candidates
+
+
+def _clear_caches():
+    confidence._normalize.cache_clear()
+    confidence._ratio.cache_clear()
+
+
+def timed(fn, searches):
+    _clear_caches()
+    start = time.perf_counter()
+    for mp3, candidates in searches:
+        fn(mp3, candidates)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument('--searches', type=int, default=200)
+    p.add_argument('--candidates', type=int, default=50)
+    p.add_argument('--threshold', type=int, default=85)
+    p.add_argument('--seed', type=int, default=1)
+    args = p.parse_args(argv)
+
+    helpers.DEBUG = False
+    rng = random.Random(args.seed)
+    searches = [make_search(rng, args.candidates) for _ in range(args.searches)]
+
+    # Parity first
+    for mp3, candidates in searches:
+        expected = [reference_confidence(mp3, c) for c in candidates]
+        assert [calculate_confidence(mp3, c) for c in candidates] == expected
+        assert score_candidates(mp3, candidates) == expected
+        pruned = score_candidates(mp3, candidates, args.threshold)
+        for got, want in zip(pruned, expected):
+            assert got == want or (got == (None, None) and want[0] < args.threshold)
+        # The best candidate (first of any ties) is always scored
+        best = max(range(len(expected)), key=lambda i: expected[i][0])
+        assert pruned[best] == expected[best]
+    print(f"parity ok: {args.searches} searches x {args.candidates} candidates "
+          f"(scoring v{confidence.SCORING_VERSION})")
+
+    pairs = args.searches * args.candidates
+    rows = [
+        ("reference (original)", timed(lambda m, cs: [reference_confidence(m, c) for c in cs], searches)),
+        ("calculate_confidence", timed(lambda m, cs: [calculate_confidence(m, c) for c in cs], searches)),
+        ("score_candidates", timed(lambda m, cs: score_candidates(m, cs), searches)),
+        (f"score_candidates t={args.threshold}",
+         timed(lambda m, cs: score_candidates(m, cs, args.threshold), searches)),
+    ]
+    base = rows[0][1]
+    for name, elapsed in rows:
+        print(f"{name:<28} {elapsed * 1000:8.1f} ms  {pairs / elapsed:10.0f} pairs/s  x{base / elapsed:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# benchmarks/bench_e2e.py
+"""
+End-to-end benchmarks against a synthetic corpus and the mock iTunes server.
+
+    python -m benchmarks.bench_e2e [--files 200] [--latency-ms 30] [--corpus DIR]
+        [--baseline benchmarks/baseline.json] [--save-baseline]
+
+Measures read_mp3_metadata (fast and full), search_apple_music,
+calculate_confidence, update_mp3_metadata and the full BatchPipeline:
+operations per second, p50/p99 latency and peak RSS. With a baseline
+file present, throughput is compared against it and the exit status is
+1 when any benchmark regressed by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks import corpus as corpus_mod
+from benchmarks.mock_itunes import MockITunes
+from metadata import apple_music
+from metadata.album_matcher import AlbumMatcher
+from metadata.apple_music import search_apple_music
+from metadata.artwork_cache import ArtworkCache, set_artwork_cache
+from metadata.mp3_reader import read_mp3_metadata
+from metadata.pipeline import BatchPipeline
+from metadata.tag_updater import update_mp3_metadata
+from utils.confidence import calculate_confidence
+from utils.discovery import Discovery
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _pct(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def measure(fn, items):
+    """Call fn(item) for each item; throughput plus latency percentiles"""
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return summarize(len(latencies), elapsed, latencies)
+
+
+def summarize(n, elapsed, latencies=None):
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        'n': n,
+        'per_sec': round(n / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': ms(_pct(latencies, 0.50)) if latencies else None,
+        'p99_ms': ms(_pct(latencies, 0.99)) if latencies else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_benchmarks(corpus_dir, work_dir):
+    results = {}
+    paths = list(Discovery(corpus_dir))
+
+    results['read_fast'] = measure(lambda p: read_mp3_metadata(p, fast=True), paths)
+    results['read_full'] = measure(lambda p: read_mp3_metadata(p), paths)
+
+    metas = [read_mp3_metadata(p, fast=True) for p in paths]
+    searched = []
+    def search(meta):
+        searched.append((meta, search_apple_music(meta['title'], meta['artist'], meta['duration_ms'], meta)))
+    results['search'] = measure(search, metas)
+
+    pairs = [(meta, c) for meta, candidates in searched for c in candidates]
+    results['confidence'] = measure(lambda pair: calculate_confidence(*pair), pairs)
+
+    update_dir = os.path.join(work_dir, 'update')
+    shutil.copytree(corpus_dir, update_dir)
+    updates = [
+        (os.path.join(update_dir, os.path.relpath(meta['file_path'], corpus_dir)),
+         max(candidates, key=lambda c: c['confidence']))
+        for meta, candidates in searched if candidates
+    ]
+    results['update'] = measure(lambda u: update_mp3_metadata(*u), updates)
+
+    batch_dir = os.path.join(work_dir, 'batch')
+    shutil.copytree(corpus_dir, batch_dir)
+    set_artwork_cache(ArtworkCache(directory=None))  # cold again, as in a first run
+    pipeline = BatchPipeline(albums=AlbumMatcher())
+    statuses = {}
+    start = time.perf_counter()
+    for result in pipeline.run(Discovery(batch_dir)):
+        statuses[result['status']] = statuses.get(result['status'], 0) + 1
+    results['batch'] = summarize(sum(statuses.values()), time.perf_counter() - start)
+    results['batch']['statuses'] = statuses
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Add 'vs_base' (throughput ratio) to each result; returns regressed names"""
+    regressed = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base or not base.get('per_sec'):
+            continue
+        r['vs_base'] = round(r['per_sec'] / base['per_sec'], 2)
+        if r['vs_base'] < 1 - tolerance:
+            regressed.append(name)
+    return regressed
+
+
+def print_table(results):
+    fmt = lambda v: '-' if v is None else v
+    print(f"{'benchmark':<12} {'n':>6} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'rss MB':>8} {'vs base':>8}")
+    for name, r in results.items():
+        print(f"{name:<12} {r['n']:>6} {r['per_sec']:>10} {fmt(r['p50_ms']):>9} {fmt(r['p99_ms']):>9} "
+              f"{fmt(r['peak_rss_mb']):>8} {fmt(r.get('vs_base')):>8}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument('--corpus', help="existing corpus directory (default: generate one in a temp dir)")
+    p.add_argument('--files', type=int, default=200)
+    p.add_argument('--albums', type=int, default=20)
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('--latency-ms', type=float, default=30, help="mock server latency per API call")
+    p.add_argument('--jitter-ms', type=float, default=10)
+    p.add_argument('--error-rate', type=float, default=0.0)
+    p.add_argument('--rate', type=float, default=0, help="mock throttling, requests/second (0 = off)")
+    p.add_argument('--baseline', default=DEFAULT_BASELINE)
+    p.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    p.add_argument('--tolerance', type=float, default=0.15, help="allowed throughput drop vs baseline")
+    p.add_argument('--json', metavar='PATH', help="also write the results here")
+    args = p.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='mp3mc-bench-')
+    try:
+        corpus_dir = args.corpus
+        if not corpus_dir:
+            corpus_dir = os.path.join(work_dir, 'corpus')
+            corpus_mod.generate(corpus_dir, args.files, args.albums, args.seed)
+        mock = MockITunes(corpus_mod.load_catalog(corpus_dir), latency_ms=args.latency_ms,
+                          jitter_ms=args.jitter_ms, error_rate=args.error_rate, rate=args.rate)
+        base_url = mock.start()
+        apple_music.ITUNES_SEARCH_URL = f"{base_url}/search"
+        apple_music.ITUNES_LOOKUP_URL = f"{base_url}/lookup"
+        set_artwork_cache(ArtworkCache(directory=None))  # never touch the user's cache
+        try:
+            results = run_benchmarks(corpus_dir, work_dir)
+        finally:
+            mock.stop()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    regressed = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressed = compare(results, json.load(f), args.tolerance)
+    print_table(results)
+    print(f"batch outcomes: {results['batch']['statuses']}")
+    print(f"mock API calls: {dict(mock.requests)}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+    if regressed:
+        print(f"REGRESSED (> {args.tolerance:.0%} slower than baseline): {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
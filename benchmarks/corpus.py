@@ -0,0 +1,175 @@
+# benchmarks/corpus.py
+"""
+Synthetic MP3 corpus with a matching catalog.
+
+    python -m benchmarks.corpus OUT_DIR [--files 200] [--albums 20] [--seed 1]
+
+Writes albums of silent 32 kbps MP3s under OUT_DIR/<artist>/<album>/ and
+OUT_DIR/catalog.json, the ground truth the mock iTunes server answers
+from. Tags vary on purpose: clean and messy text, ID3 v2.3 and v2.4,
+TYER or TDRC, no / small / large / PNG / duplicate cover art, and a share
+of tracks that are not in the catalog at all.
+"""
+import argparse
+import io
+import json
+import os
+import random
+
+from mutagen.id3 import ID3, TIT2, TPE1, TALB, TYER, TDRC, TCON, TRCK, APIC
+from PIL import Image
+
+CATALOG_FILE = 'catalog.json'
+
+# MPEG-1 Layer III, 32 kbps, 44.1 kHz, no padding: 104-byte frames of silence
+_FRAME = b'\xff\xfb\x10\x00' + b'\x00' * 100
+_FRAMES_PER_SECOND = 44100 / 1152
+
+WORDS = ("love", "night", "blue", "heart", "road", "fire", "dream", "city", "rain", "gold",
+         "light", "home", "wild", "river", "star", "ghost", "summer", "dance", "echo", "stone",
+         "silver", "ocean", "shadow", "north", "glass", "velvet", "thunder", "paper", "neon", "iron")
+GENRES = ("Rock", "Pop", "Electronic", "Jazz", "Hip-Hop/Rap", "Alternative", "Country")
+
+
+def _phrase(rng, lo, hi):
+    return " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(lo, hi)))
+
+
+def _image(size, color, fmt='JPEG'):
+    buf = io.BytesIO()
+    Image.new('RGB', (size, size), color).save(buf, fmt, quality=85)
+    return buf.getvalue()
+
+
+def make_catalog(rng, albums, tracks_per_album=(8, 14)):
+    """Albums with collectionId, tracks with trackId, number and duration"""
+    catalog = []
+    for a in range(albums):
+        cid = 1000 + a
+        artist = _phrase(rng, 1, 3)
+        year = rng.randint(1965, 2023)
+        tracks = [{
+            'trackId': cid * 100 + n,
+            'trackName': _phrase(rng, 1, 4),
+            'trackNumber': n,
+            'trackTimeMillis': rng.randint(90, 300) * 1000,
+        } for n in range(1, rng.randint(*tracks_per_album) + 1)]
+        catalog.append({
+            'collectionId': cid,
+            'collectionName': _phrase(rng, 1, 3),
+            'artistName': artist,
+            'primaryGenreName': rng.choice(GENRES),
+            'releaseDate': f'{year}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T07:00:00Z',
+            'tracks': tracks,
+        })
+    return catalog
+
+
+def _messy(rng, text):
+    """The kind of damage real libraries have"""
+    return rng.choice((
+        text.lower(),
+        text.upper(),
+        f"{text} (Remastered)",
+        f"{text} - Remastered",
+        f"  {text} ",
+        text.replace(' ', '  ', 1),
+    ))
+
+
+def write_mp3(path, seconds, tags, art=None, v2_version=4):
+    frames = int(seconds * _FRAMES_PER_SECOND)
+    with open(path, 'wb') as f:
+        f.write(_FRAME * frames)
+    id3 = ID3()
+    id3.add(TIT2(encoding=3, text=tags['title']))
+    id3.add(TPE1(encoding=3, text=tags['artist']))
+    if tags.get('album'):
+        id3.add(TALB(encoding=3, text=tags['album']))
+    if tags.get('year'):
+        year_frame = TDRC if v2_version == 4 else TYER
+        id3.add(year_frame(encoding=3, text=tags['year']))
+    if tags.get('genre'):
+        id3.add(TCON(encoding=3, text=tags['genre']))
+    if tags.get('track'):
+        id3.add(TRCK(encoding=3, text=tags['track']))
+    for i, (mime, data) in enumerate(art or ()):
+        id3.add(APIC(encoding=3, mime=mime, type=3, desc=f'Cover{i}' if i else 'Cover', data=data))
+    id3.save(path, v2_version=v2_version)
+
+
+def generate(out_dir, files=200, albums=20, seed=1, messy_ratio=0.3, unknown_ratio=0.1):
+    """Write the corpus and catalog; returns the list of MP3 paths"""
+    rng = random.Random(seed)
+    catalog = make_catalog(rng, albums)
+    arts = {
+        'small': ('image/jpeg', _image(300, (200, 40, 40))),
+        'large': ('image/jpeg', _image(1400, (40, 40, 200))),
+        'png': ('image/png', _image(500, (40, 200, 40), 'PNG')),
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    slots = [(album, track) for album in catalog for track in album['tracks']]
+    rng.shuffle(slots)
+    for i in range(files):
+        if i < len(slots) and rng.random() >= unknown_ratio:
+            album, track = slots[i]
+            tags = {
+                'title': track['trackName'], 'artist': album['artistName'],
+                'album': album['collectionName'], 'year': album['releaseDate'][:4],
+                'genre': album['primaryGenreName'], 'track': str(track['trackNumber']),
+            }
+            seconds = track['trackTimeMillis'] / 1000 + rng.uniform(-1.5, 1.5)
+            if rng.random() < messy_ratio:
+                tags['title'] = _messy(rng, tags['title'])
+                tags['artist'] = _messy(rng, tags['artist'])
+                if rng.random() < 0.3:
+                    tags['album'] = None
+                if rng.random() < 0.5:
+                    tags['year'] = None
+            folder = os.path.join(out_dir, album['artistName'], album['collectionName'])
+        else:
+            # Not in the catalog: exercises the no-match path
+            tags = {'title': _phrase(rng, 2, 4), 'artist': _phrase(rng, 2, 3), 'album': None}
+            seconds = rng.randint(90, 300)
+            folder = os.path.join(out_dir, 'Unsorted')
+
+        art_kind = rng.choice(('none', 'small', 'small', 'large', 'png', 'double'))
+        if art_kind == 'none':
+            art = []
+        elif art_kind == 'double':
+            art = [arts['small'], arts['large']]
+        else:
+            art = [arts[art_kind]]
+
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'{i:05d}.mp3')
+        write_mp3(path, seconds, tags, art, v2_version=rng.choice((3, 4)))
+        paths.append(path)
+
+    with open(os.path.join(out_dir, CATALOG_FILE), 'w', encoding='utf-8') as f:
+        json.dump(catalog, f)
+    return paths
+
+
+def load_catalog(corpus_dir):
+    with open(os.path.join(corpus_dir, CATALOG_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument('out_dir')
+    p.add_argument('--files', type=int, default=200)
+    p.add_argument('--albums', type=int, default=20)
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('--messy', type=float, default=0.3, help="share of files with damaged tags")
+    p.add_argument('--unknown', type=float, default=0.1, help="share of files not in the catalog")
+    args = p.parse_args(argv)
+    paths = generate(args.out_dir, args.files, args.albums, args.seed, args.messy, args.unknown)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"wrote {len(paths)} files ({size / 1e6:.1f} MB) and {CATALOG_FILE} to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
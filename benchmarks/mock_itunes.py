@@ -0,0 +1,230 @@
+# benchmarks/mock_itunes.py
+"""
+Local stand-in for the iTunes Search and Lookup APIs.
+
+    python -m benchmarks.mock_itunes CORPUS_DIR [--port 8765] [--latency-ms 50]
+        [--jitter-ms 20] [--error-rate 0.01] [--rate 20]
+
+Serves /search (entity=song|album), /lookup (id=collectionId) and
+/art/<collectionId>/<W>x<H>bb.jpg from a corpus catalog.json. Latency,
+random 503s and token-bucket throttling (403 with Retry-After, like
+Apple) are configurable. Point the app at it with
+ITUNES_SEARCH_URL=http://127.0.0.1:8765/search and
+ITUNES_LOOKUP_URL=http://127.0.0.1:8765/lookup.
+"""
+import argparse
+import io
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from PIL import Image
+
+from benchmarks.corpus import load_catalog
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_ART_PATH = re.compile(r"^/art/(\d+)/(\d+)x(\d+)bb\.jpg$")
+
+
+def _tokens(text):
+    return set(_TOKEN.findall(text.lower()))
+
+
+class MockCatalog:
+    """Token index over the catalog; results ranked by shared query tokens"""
+
+    def __init__(self, catalog, base_url):
+        self.base_url = base_url
+        self.albums = {a['collectionId']: a for a in catalog}
+        self.songs = []
+        self._song_index = defaultdict(set)
+        self._album_index = defaultdict(set)
+        for album in catalog:
+            for tok in _tokens(f"{album['collectionName']} {album['artistName']}"):
+                self._album_index[tok].add(album['collectionId'])
+            for track in album['tracks']:
+                i = len(self.songs)
+                self.songs.append(self._song(album, track))
+                for tok in _tokens(f"{track['trackName']} {album['artistName']}"):
+                    self._song_index[tok].add(i)
+
+    def _collection(self, album):
+        return {
+            'wrapperType': 'collection', 'collectionType': 'Album',
+            'collectionId': album['collectionId'], 'collectionName': album['collectionName'],
+            'artistName': album['artistName'], 'primaryGenreName': album['primaryGenreName'],
+            'releaseDate': album['releaseDate'], 'trackCount': len(album['tracks']),
+            'artworkUrl100': f"{self.base_url}/art/{album['collectionId']}/100x100bb.jpg",
+        }
+
+    def _song(self, album, track):
+        song = self._collection(album)
+        song.update(wrapperType='track', kind='song', trackId=track['trackId'],
+                    trackName=track['trackName'], trackNumber=track['trackNumber'],
+                    trackTimeMillis=track['trackTimeMillis'], discNumber=1)
+        song.pop('collectionType')
+        return song
+
+    @staticmethod
+    def _rank(index, query, limit):
+        hits = defaultdict(int)
+        for tok in _tokens(query):
+            for key in index.get(tok, ()):
+                hits[key] += 1
+        return sorted(hits, key=lambda k: -hits[k])[:limit]
+
+    def search(self, term, entity, limit):
+        if entity == 'album':
+            return [self._collection(self.albums[c]) for c in self._rank(self._album_index, term, limit)]
+        return [self.songs[i] for i in self._rank(self._song_index, term, limit)]
+
+    def lookup(self, collection_id, limit):
+        album = self.albums.get(collection_id)
+        if album is None:
+            return []
+        return [self._collection(album)] + [self._song(album, t) for t in album['tracks'][:limit]]
+
+
+class MockITunes:
+    """
+    Threaded mock server. start() returns the base URL; stop() shuts it down.
+    `rate` is requests/second across all clients (0 = unlimited).
+    """
+
+    def __init__(self, catalog, port=0, latency_ms=0, jitter_ms=0, error_rate=0.0, rate=0, seed=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate = rate
+        self.requests = defaultdict(int)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(max(1, rate))
+        self._last = time.monotonic()
+        self._art = {}
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self.catalog = MockCatalog(catalog, self.base_url)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _throttled(self):
+        if not self.rate:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.rate), self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return False
+            return True
+
+    def _delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self._lock:
+                jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+    def _fail(self):
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def artwork(self, collection_id, size):
+        key = (collection_id, size)
+        with self._lock:
+            data = self._art.get(key)
+        if data is None:
+            rng = random.Random(collection_id)
+            buf = io.BytesIO()
+            Image.new('RGB', (size, size), tuple(rng.randrange(256) for _ in range(3))).save(buf, 'JPEG')
+            data = buf.getvalue()
+            with self._lock:
+                self._art[key] = data
+        return data
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            wbufsize = 64 * 1024  # one send per response; split writes hit delayed-ACK stalls
+
+            def _send(self, status, body=b'', ctype='application/json', headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', ctype)
+                self.send_header('Content-Length', str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                q = {k: v[0] for k, v in parse_qs(url.query).items()}
+                with mock._lock:
+                    mock.requests[url.path.split('/')[1] or 'root'] += 1
+
+                art = _ART_PATH.match(url.path)
+                if art:
+                    return self._send(200, mock.artwork(int(art.group(1)), int(art.group(2))), 'image/jpeg')
+                if url.path == '/stats':
+                    return self._send(200, json.dumps(mock.requests).encode())
+
+                if mock._throttled():
+                    return self._send(403, b'{}', headers={'Retry-After': '1'})
+                mock._delay()
+                if mock._fail():
+                    return self._send(503, b'{}')
+
+                limit = int(q.get('limit', 50))
+                if url.path == '/search':
+                    results = mock.catalog.search(q.get('term', ''), q.get('entity', 'song'), limit)
+                elif url.path == '/lookup':
+                    results = mock.catalog.lookup(int(q.get('id', 0)), limit)
+                else:
+                    return self._send(404, b'{}')
+                body = json.dumps({'resultCount': len(results), 'results': results}).encode()
+                self._send(200, body, 'text/javascript; charset=utf-8')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument('corpus', help="directory containing catalog.json (see benchmarks.corpus)")
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--latency-ms', type=float, default=0)
+    p.add_argument('--jitter-ms', type=float, default=0)
+    p.add_argument('--error-rate', type=float, default=0.0)
+    p.add_argument('--rate', type=float, default=0, help="requests/second before throttling (0 = off)")
+    args = p.parse_args(argv)
+    mock = MockITunes(load_catalog(args.corpus), args.port, args.latency_ms, args.jitter_ms,
+                      args.error_rate, args.rate)
+    print(f"mock iTunes on {mock.base_url}/search and {mock.base_url}/lookup")
+    mock.start()
+    try:
+        mock._thread.join()
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
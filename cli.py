@@ -0,0 +1,229 @@
+# cli.py
+"""
+Headless batch tagger: read → search → score → write without Tk.
+
+Writes one JSON line per file to stdout (or --output) as soon as that
+file finishes, e.g.
+
+    python cli.py ~/Music --workers 8 --threshold 90 --dry-run > results.jsonl
+
+Several hosts can share one library through a work queue database:
+
+    python cli.py /mnt/nas/music --queue /mnt/nas/music/.tag_queue.sqlite   (on each host)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from metadata.batch import DEFAULT_THRESHOLD
+from metadata.pipeline import BatchPipeline
+from metadata.album_matcher import AlbumMatcher
+from metadata.artwork import ArtworkSpec, DEFAULT_SPEC, set_artwork_spec
+from metadata.audio_hash import AudioDeduper
+from metadata.catalog import get_catalog, CATALOG_ENV
+from metadata.journal import BatchJournal
+from metadata.records import json_default
+from metadata.work_queue import WorkQueue
+from metadata.search_cache import SearchCache, DEFAULT_CACHE_PATH
+from metadata.library_index import LibraryIndex, DEFAULT_INDEX_PATH
+from utils import helpers
+from utils.discovery import Discovery, DEFAULT_INCLUDE
+from utils.metrics import METRICS
+
+
+def run(paths, out, pipeline, progress=0, metrics_prom=None):
+    """
+    Stream pipeline results to `out` as JSON lines; returns status counts.
+    `paths` may be a Discovery, whose running count is added to progress lines.
+    """
+    counts = {}
+    last_report = time.monotonic()
+    for result in pipeline.run(paths):
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+        out.write(json.dumps(result, default=json_default) + '\n')
+        out.flush()
+        if progress and time.monotonic() - last_report >= progress:
+            found = f"found {paths.found} | " if isinstance(paths, Discovery) else ""
+            print(found + pipeline.format_stats(), file=sys.stderr)
+            if metrics_prom:
+                METRICS.write_prometheus(metrics_prom)
+            last_report = time.monotonic()
+    return counts
+
+
+def _process_count(value):
+    """argparse type for --read-processes: a count, or 'auto' for the CPU count"""
+    if value == 'auto':
+        return os.cpu_count() or 1
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number or 'auto', got {value!r}")
+    if n < 0:
+        raise argparse.ArgumentTypeError("must not be negative")
+    return n
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Tag MP3 files from Apple Music without the GUI.")
+    p.add_argument('roots', nargs='*', help="directories (or single .mp3 files) to process")
+    p.add_argument('--include', action='append', metavar='GLOB',
+                   help=f"file name pattern to process; repeatable (default: {' '.join(DEFAULT_INCLUDE)})")
+    p.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                   help="skip files and whole directories matching this name or path pattern; repeatable")
+    p.add_argument('--scan-workers', type=int, default=1,
+                   help="directories listed in parallel, useful on network shares (default: 1)")
+    p.add_argument('-w', '--workers', type=int, default=4, help="concurrent catalog searches (default: 4)")
+    p.add_argument('--read-workers', type=int, default=2, help="concurrent tag reads (default: 2)")
+    p.add_argument('--read-processes', type=_process_count, default=0, metavar='N|auto',
+                   help="parse tags in N processes, or 'auto' for one per CPU (default: 0, in threads)")
+    p.add_argument('--write-workers', type=int, default=2, help="concurrent tag writes (default: 2)")
+    p.add_argument('--writes-per-device', type=int, default=1, metavar='N',
+                   help="concurrent tag saves per disk or mount; raise for SSDs (default: 1)")
+    p.add_argument('--queue-size', type=int, default=32, help="bound on each inter-stage queue (default: 32)")
+    p.add_argument('-t', '--threshold', type=int, default=DEFAULT_THRESHOLD,
+                   help=f"minimum confidence to write tags (default: {DEFAULT_THRESHOLD})")
+    p.add_argument('-n', '--dry-run', action='store_true', help="match and score but never write tags (or library index entries)")
+    p.add_argument('--art-max-size', type=int, default=DEFAULT_SPEC.max_size, metavar='PX',
+                   help=f"embedded cover: longest side in pixels (default: {DEFAULT_SPEC.max_size})")
+    p.add_argument('--art-quality', type=int, default=DEFAULT_SPEC.quality, metavar='Q',
+                   help=f"embedded cover: JPEG quality when re-encoding (default: {DEFAULT_SPEC.quality})")
+    p.add_argument('--art-max-kb', type=int, default=DEFAULT_SPEC.max_bytes // 1024, metavar='KB',
+                   help=f"embedded cover: size budget (default: {DEFAULT_SPEC.max_bytes // 1024})")
+    p.add_argument('-o', '--output', help="write JSONL here instead of stdout")
+    p.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="search cache database path")
+    p.add_argument('--no-cache', action='store_true', help="disable the search response cache")
+    p.add_argument('--catalog', metavar='DB',
+                   help=f"match against a local catalog database (python -m metadata.local_catalog) "
+                        f"instead of the iTunes API; default ${CATALOG_ENV} if set")
+    p.add_argument('--per-track', action='store_true',
+                   help="search every file on its own instead of matching whole albums first")
+    p.add_argument('--dedupe', action='store_true',
+                   help="match each distinct audio stream once and give copies (same audio, other tags) its result")
+    p.add_argument('--duplicates-report', metavar='PATH',
+                   help="write groups of files with identical audio here as JSON (implies --dedupe); "
+                        "files skipped by the index or journal are hashed too, so it covers every file")
+    p.add_argument('--index', default=DEFAULT_INDEX_PATH, help="library index database path")
+    p.add_argument('--no-index', action='store_true', help="process every file and record nothing")
+    p.add_argument('-f', '--force', action='store_true',
+                   help="re-match files the index says are unchanged (results are still recorded)")
+    p.add_argument('--invalidate', action='append', default=[], metavar='PATH',
+                   help="forget index entries for PATH (file or directory) before running; repeatable")
+    p.add_argument('--journal', metavar='PATH', help="checkpoint every outcome to this append-only JSONL file")
+    p.add_argument('--resume', action='store_true',
+                   help="skip files the --journal already lists as complete")
+    p.add_argument('--queue', metavar='DB',
+                   help="share the work with other hosts through this queue database (e.g. on the NAS); "
+                        "the roots are added to it first, and with no roots this host only works the queue")
+    p.add_argument('--queue-root', metavar='DIR',
+                   help="store queued paths relative to this directory, for hosts that mount the library elsewhere")
+    p.add_argument('--lease', type=float, default=300, metavar='SECONDS',
+                   help="how long a silent worker keeps its claimed files before others take them (default: 300)")
+    p.add_argument('--progress', type=float, default=0, metavar='SECONDS',
+                   help="print per-stage queue depth and throughput to stderr this often")
+    p.add_argument('--metrics-json', metavar='PATH', help="write counters and latency summaries here at the end")
+    p.add_argument('--metrics-prom', metavar='PATH',
+                   help="write a Prometheus textfile here at the end (and with every --progress report)")
+    p.add_argument('--debug', action='store_true', help="print debug output to stderr")
+    args = p.parse_args(argv)
+    if not args.roots and not args.queue:
+        p.error("give at least one root, or --queue")
+    if args.art_max_size <= 0:
+        p.error("--art-max-size must be greater than 0")
+    if not 1 <= args.art_quality <= 95:
+        p.error("--art-quality must be between 1 and 95")
+    if args.art_max_kb <= 0:
+        p.error("--art-max-kb must be greater than 0")
+    if args.queue and args.dry_run:
+        # Dry-run outcomes would be recorded as done and never tagged by any host
+        p.error("--dry-run cannot be used with --queue")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    helpers.DEBUG = args.debug
+    set_artwork_spec(ArtworkSpec(args.art_max_size, args.art_quality, args.art_max_kb * 1024))
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+
+    cache = None if args.no_cache else SearchCache(args.cache)
+    index = None if args.no_index else LibraryIndex(args.index)
+    if index is not None:
+        for prefix in args.invalidate:
+            print(f"invalidated {index.invalidate(prefix)} index entries under {prefix}", file=sys.stderr)
+
+    journal = BatchJournal(args.journal) if args.journal else None
+    if journal is not None and args.resume:
+        print(f"resuming: {journal.load(args.dry_run)} files already complete", file=sys.stderr)
+
+    catalog = get_catalog(cache, args.catalog)
+    albums = None if args.per_track else AlbumMatcher(cache, catalog=catalog)
+    dedupe = None
+    if args.dedupe or args.duplicates_report:
+        dedupe = AudioDeduper(report_all=bool(args.duplicates_report))
+    work_queue = WorkQueue(args.queue, root=args.queue_root, lease_s=args.lease) if args.queue else None
+    pipeline = BatchPipeline(
+        threshold=args.threshold, dry_run=args.dry_run, cache=cache,
+        read_workers=args.read_workers, read_processes=args.read_processes,
+        search_workers=args.workers,
+        write_workers=args.write_workers, writes_per_device=args.writes_per_device,
+        queue_size=args.queue_size,
+        index=index, force=args.force, albums=albums, journal=journal, catalog=catalog,
+        dedupe=dedupe, work_queue=work_queue
+    )
+    try:
+        discovery = Discovery(args.roots, include=args.include or DEFAULT_INCLUDE,
+                              exclude=args.exclude, workers=args.scan_workers)
+        paths = discovery
+        if work_queue is not None:
+            if args.roots:
+                print(f"queue: added {work_queue.add(discovery)} new files", file=sys.stderr)
+            paths = work_queue.claims()
+        counts = run(paths, out, pipeline, args.progress, args.metrics_prom)
+    finally:
+        if args.output:
+            out.close()
+        if work_queue is not None:
+            work_queue.close()
+            print(f"queue: claimed {work_queue.claimed}, completed {work_queue.completed}"
+                  f" ({work_queue.duplicates} already done elsewhere)", file=sys.stderr)
+        if cache is not None:
+            print(f"search cache: {cache.stats()}", file=sys.stderr)
+            cache.close()
+        if index is not None:
+            index.close()
+        if journal is not None:
+            journal.close()
+
+    print(f"found {discovery.found} files in {discovery.dirs} directories | {pipeline.format_stats()}",
+          file=sys.stderr)
+    if pipeline.writes.stats():
+        print(f"writes: {pipeline.writes.format_stats()}", file=sys.stderr)
+    if albums is not None:
+        print(f"albums: {albums.stats()}", file=sys.stderr)
+    if dedupe is not None:
+        print(f"duplicates: {dedupe.stats()}", file=sys.stderr)
+        if args.duplicates_report:
+            with open(args.duplicates_report, 'w', encoding='utf-8') as f:
+                json.dump(dedupe.report(), f, indent=2)
+    if pipeline.resumed:
+        counts['resumed'] = pipeline.resumed
+    if pipeline.unchanged:
+        counts['unchanged'] = counts.get('unchanged', 0) + pipeline.unchanged
+    timings = METRICS.format_summary()
+    if timings:
+        print(f"timings:\n{timings}", file=sys.stderr)
+    if args.metrics_json:
+        METRICS.write_json(args.metrics_json)
+    if args.metrics_prom:
+        METRICS.write_prometheus(args.metrics_prom)
+    summary = ', '.join(f"{k}={v}" for k, v in sorted(counts.items())) or 'no files'
+    print(f"done: {summary}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# metadata/album_matcher.py
+import os
+import threading
+from collections import OrderedDict
+
+from metadata.apple_music import score_apple_candidates
+from metadata.catalog import ITunesCatalog
+from utils.confidence import normalize, string_similarity
+from utils.helpers import debug_log
+
+# How closely a catalog collection must match the tags to be used for the group
+MIN_ALBUM_SIMILARITY = 70
+# Selection-only nudge for a matching track number; never added to confidence
+TRACK_NUMBER_BONUS = 10
+
+
+def parse_track_number(value):
+    """'3/12' → 3; anything unparseable → None"""
+    try:
+        return int(str(value).split('/', 1)[0])
+    except (TypeError, ValueError):
+        return None
+
+
+class _Pending:
+    def __init__(self):
+        self.done = threading.Event()
+        self.tracks = None
+
+
+class AlbumMatcher:
+    """
+    One catalog lookup per album instead of one search per track.
+
+    Files are grouped by (directory, artist, album). The first file of a
+    group triggers one album search plus one collection lookup; other files
+    of the group wait for it and reuse the track list. Recent groups are
+    kept in an LRU, which suits a batch that visits the library directory
+    by directory. Each file is then assigned the album track that best
+    fits its track number, duration and title.
+    """
+
+    def __init__(self, cache=None, max_groups=512, catalog=None):
+        self.cache = cache
+        self.catalog = catalog if catalog is not None else ITunesCatalog(cache)
+        self.max_groups = max_groups
+        self._groups = OrderedDict()  # key -> album track list ([] = no album)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.album_lookups = 0
+        self.assigned = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def group_key(mp3):
+        artist, album = mp3.get('artist'), mp3.get('album')
+        if not artist or not album or 'Unknown' in (artist, album):
+            return None
+        return (os.path.dirname(mp3.get('file_path', '')), normalize(artist), normalize(album))
+
+    def album_tracks(self, mp3):
+        """The catalog track list for this file's album group, or [] if none fits"""
+        key = self.group_key(mp3)
+        if key is None:
+            return []
+
+        with self._lock:
+            if key in self._groups:
+                self._groups.move_to_end(key)
+                return self._groups[key]
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = _Pending()
+
+        if not owner:
+            pending.done.wait()
+            return pending.tracks or []
+
+        try:
+            pending.tracks = self._resolve(mp3['artist'], mp3['album'])
+            with self._lock:
+                self._groups[key] = pending.tracks
+                while len(self._groups) > self.max_groups:
+                    self._groups.popitem(last=False)
+        except Exception as e:
+            # Transient failures are not remembered; the file falls back to per-track search
+            debug_log(f"Album lookup failed for {mp3['album']}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.done.set()
+        return pending.tracks or []
+
+    def _resolve(self, artist, album):
+        best, best_score = None, 0
+        for c in self.catalog.search_albums(artist, album):
+            score = (0.6 * string_similarity(album, c.get('collectionName', ''))
+                     + 0.4 * string_similarity(artist, c.get('artistName', '')))
+            if score > best_score:
+                best, best_score = c, score
+        if best is None or best_score < MIN_ALBUM_SIMILARITY:
+            debug_log(f"No catalog album for {artist} / {album}")
+            return []
+
+        with self._lock:
+            self.album_lookups += 1
+        return self.catalog.album_tracks(best['collectionId'])
+
+    def match(self, mp3, threshold):
+        """
+        Return [assigned track] when the album has a track for this file at
+        or above `threshold`, else None so the caller can search per track.
+        """
+        tracks = self.album_tracks(mp3)
+        if not tracks:
+            with self._lock:
+                self.fallbacks += 1
+            return None
+
+        # Copies: the group's list is shared between worker threads
+        candidates = score_apple_candidates(mp3, [t.copy() for t in tracks])
+        number = parse_track_number(mp3.get('track'))
+        best = max(candidates, key=lambda c: c['confidence'] + (
+            TRACK_NUMBER_BONUS if number is not None and parse_track_number(c['track']) == number else 0))
+
+        with self._lock:
+            if best['confidence'] >= threshold:
+                self.assigned += 1
+                return [best]
+            self.fallbacks += 1
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'groups': len(self._groups),
+                'album_lookups': self.album_lookups,
+                'assigned': self.assigned,
+                'fallbacks': self.fallbacks,
+            }
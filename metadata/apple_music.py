@@ -1,60 +1,111 @@
 # metadata/apple_music.py
+import os
 import requests
-from utils.helpers import debug_log, compute_year, format_duration
-from utils.confidence import calculate_confidence  # <-- ADD THIS LINE
+from utils.helpers import debug_log, compute_year
+from metadata.records import CandidateRecord
+from utils.http_client import get_http_client
+from utils.confidence import score_candidates
+from utils.metrics import METRICS
 
-def search_apple_music(title, artist, duration_ms=None, full_mp3_meta=None):
-    query = f"{title} {artist}".strip()
-    url = f"https://itunes.apple.com/search?term={requests.utils.quote(query)}&entity=song&limit=50"
+# Overridable so batch jobs and tests can point at a local stub server
+ITUNES_SEARCH_URL = os.environ.get('ITUNES_SEARCH_URL', 'https://itunes.apple.com/search')
+ITUNES_LOOKUP_URL = os.environ.get('ITUNES_LOOKUP_URL', 'https://itunes.apple.com/lookup')
+# Apple answers 403 as well as 429 when it throttles the search API
+ITUNES_RETRY_STATUSES = (403, 429, 500, 502, 503, 504)
+
+def _itunes_results(url):
     debug_log('Apple Music API', url)
+    with METRICS.timer('itunes_http'):
+        resp = get_http_client().get(url, timeout=10, retry_statuses=ITUNES_RETRY_STATUSES)
+    resp.raise_for_status()
+    with METRICS.timer('json_parse'):
+        return resp.json().get('results', [])
+
+def _cached(cache, kind, query, limit, fetch):
+    """Serve `fetch()` through the search cache; only successful responses are stored"""
+    if cache is not None:
+        cached = cache.get(query, limit, kind)
+        if cached is not None:
+            METRICS.inc('search_cache_hits')
+            return cached
+        METRICS.inc('search_cache_misses')
+    results = fetch()
+    # Empty responses are negative-cached
+    if cache is not None:
+        cache.put(query, limit, results, kind)
+    return results
+
+def fetch_apple_tracks(query, limit=50, cache=None):
+    """Return raw iTunes song results for `query`, consulting `cache` first"""
+    def fetch():
+        url = f"{ITUNES_SEARCH_URL}?term={requests.utils.quote(query)}&entity=song&limit={limit}"
+        return [
+            r for r in _itunes_results(url)
+            if r.get('wrapperType') == 'track' and r.get('kind') == 'song'
+        ]
+    return _cached(cache, 'song', query, limit, fetch)
 
-    try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+def search_apple_albums(artist, album, cache=None, limit=10):
+    """Raw iTunes collection results for an artist/album pair"""
+    query = f"{album} {artist}".strip()
+    def fetch():
+        url = f"{ITUNES_SEARCH_URL}?term={requests.utils.quote(query)}&entity=album&limit={limit}"
+        return [r for r in _itunes_results(url) if r.get('wrapperType') == 'collection']
+    return _cached(cache, 'album', query, limit, fetch)
 
-        tracks = [
-            r for r in data.get('results', [])
+def lookup_album_tracks(collection_id, cache=None, limit=200):
+    """Formatted song list of one collection, in disc/track order"""
+    def fetch():
+        url = f"{ITUNES_LOOKUP_URL}?id={collection_id}&entity=song&limit={limit}"
+        return [
+            r for r in _itunes_results(url)
             if r.get('wrapperType') == 'track' and r.get('kind') == 'song'
         ]
+    tracks = _cached(cache, 'lookup', str(collection_id), limit, fetch)
+    tracks.sort(key=lambda r: (r.get('discNumber', 1), r.get('trackNumber', 0)))
+    return [format_apple_track(r) for r in tracks]
+
+def find_apple_candidates(title, artist, duration_ms=None, cache=None, limit=50):
+    """Fetch and format catalog candidates, closest duration first (unscored)"""
+    query = f"{title} {artist}".strip()
+    tracks = fetch_apple_tracks(query, limit, cache)
+
+    # Sort by duration match first
+    if duration_ms is not None:
+        tracks.sort(key=lambda x: abs(x.get('trackTimeMillis', 0) - duration_ms))
+
+    return [format_apple_track(r) for r in tracks[:limit]]
+
+def score_apple_candidates(mp3_for_conf, candidates, threshold=None):
+    """
+    Set 'confidence' on each candidate in place and return the list.
+    With a threshold, candidates that cannot reach it get None, except
+    that the best candidate is always scored (see score_candidates).
+    """
+    with METRICS.timer('scoring'):
+        scored = score_candidates(mp3_for_conf, candidates, threshold)
+    METRICS.inc('candidates_scored', len(candidates))
+    for apple, (score, _) in zip(candidates, scored):
+        apple['confidence'] = score
+    return candidates
 
-        # Sort by duration match first
-        if duration_ms is not None:
-            tracks.sort(key=lambda x: abs(x.get('trackTimeMillis', 0) - duration_ms))
-
-        # Use full metadata if provided, otherwise fallback to minimal
-        mp3_for_conf = full_mp3_meta or {
-            'title': title,
-            'artist': artist,
-            'duration_ms': duration_ms or 0,
-            'album': '',
-            'year': '',
-            'genre': '',
-            'track': ''
-        }
-
-        enriched = []
-        for r in tracks[:50]:
-            apple = format_apple_track(r)
-            score, _ = calculate_confidence(mp3_for_conf, apple)
-            apple['confidence'] = score
-            enriched.append(apple)
-
-        return enriched
-
-    except Exception as e:
-        debug_log(f'Apple Music error: {e}')
-        return []
+def search_apple_music(title, artist, duration_ms=None, full_mp3_meta=None, cache=None, limit=50):
+    """
+    Scored candidates, fetched adaptively (see CatalogBackend.find_scored);
+    full_mp3_meta scores against every field, otherwise title/artist/duration
+    """
+    from metadata.catalog import ITunesCatalog  # catalog builds on this module
+    return ITunesCatalog(cache).search(title, artist, duration_ms, full_mp3_meta, limit)
 
 def format_apple_track(track):
-    return {
-        'title': track.get('trackName', 'Unknown'),
-        'artist': track.get('artistName', 'Unknown'),
-        'album': track.get('collectionName', 'Unknown'),
-        'year': compute_year(track.get('releaseDate')),
-        'genre': track.get('primaryGenreName', 'Unknown'),
-        'track': track.get('trackNumber', 'Unknown'),
-        'duration': format_duration(track.get('trackTimeMillis', 0)),
-        'duration_ms': track.get('trackTimeMillis', 0),
-        'album_art_url': track.get('artworkUrl100', '').replace('100x100', '600x600', 1)
-    }
\ No newline at end of file
+    return CandidateRecord(
+        title=track.get('trackName', 'Unknown'),
+        artist=track.get('artistName', 'Unknown'),
+        album=track.get('collectionName', 'Unknown'),
+        year=compute_year(track.get('releaseDate')),
+        genre=track.get('primaryGenreName', 'Unknown'),
+        track=track.get('trackNumber', 'Unknown'),
+        duration_ms=track.get('trackTimeMillis', 0),
+        album_art_url=track.get('artworkUrl100', '').replace('100x100', '600x600', 1),
+        collection_id=track.get('collectionId')
+    )
\ No newline at end of file
@@ -0,0 +1,70 @@
+# metadata/artwork.py
+from collections import namedtuple
+from io import BytesIO
+
+from PIL import Image
+
+# Embedded cover limits: longest side in pixels, JPEG quality, size in bytes
+ArtworkSpec = namedtuple('ArtworkSpec', 'max_size quality max_bytes')
+DEFAULT_SPEC = ArtworkSpec(max_size=600, quality=85, max_bytes=150 * 1024)
+# How far normalize_artwork may go to meet the byte budget
+MIN_QUALITY = 50
+MIN_SIZE = 200
+
+_spec = DEFAULT_SPEC
+
+
+def get_artwork_spec():
+    return _spec
+
+
+def set_artwork_spec(spec):
+    """Use `spec` for every cover embedded from now on (e.g. from CLI options)"""
+    global _spec
+    _spec = spec
+
+
+def spec_key(spec):
+    return f"art{spec.max_size}q{spec.quality}b{spec.max_bytes}"
+
+
+def _encode(img, quality):
+    out = BytesIO()
+    img.save(out, 'JPEG', quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def normalize_artwork(data, spec=DEFAULT_SPEC):
+    """
+    Cover bytes as a JPEG within `spec`.
+
+    A JPEG that already fits is returned untouched (no generation loss).
+    Anything else is scaled down to max_size and encoded at spec.quality;
+    while the result is over max_bytes, quality steps down to MIN_QUALITY,
+    then the size shrinks towards MIN_SIZE. Raises on corrupt data.
+    """
+    img = Image.open(BytesIO(data))
+    if img.format == 'JPEG' and max(img.size) <= spec.max_size and len(data) <= spec.max_bytes:
+        return data
+    if img.format == 'JPEG':
+        img.draft('RGB', (spec.max_size, spec.max_size))
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        # Flatten onto white rather than letting transparent areas turn black
+        rgba = img.convert('RGBA')
+        img = Image.new('RGB', rgba.size, (255, 255, 255))
+        img.paste(rgba, mask=rgba.split()[-1])
+    else:
+        img = img.convert('RGB')
+
+    size = spec.max_size
+    while True:
+        frame = img.copy()
+        frame.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        # Always encode at least once, even when spec.quality is below MIN_QUALITY
+        for quality in range(spec.quality, min(spec.quality, MIN_QUALITY) - 1, -10):
+            out = _encode(frame, quality)
+            if len(out) <= spec.max_bytes:
+                return out
+        if size <= MIN_SIZE:
+            return out  # best effort: smallest size, lowest quality
+        size = max(MIN_SIZE, int(size * 0.75))
@@ -0,0 +1,314 @@
+# metadata/artwork_cache.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from metadata.artwork import get_artwork_spec, normalize_artwork, spec_key
+from utils.helpers import debug_log
+from utils.http_client import get_http_client
+from utils.metrics import METRICS
+
+DEFAULT_ARTWORK_DIR = os.path.join(os.path.expanduser('~'), '.mp3_metadata_cleaner', 'artwork')
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class _Pending:
+    """A download other callers for the same URL can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+        self.error = None
+
+
+class ArtworkCache:
+    """
+    Two-tier artwork store so each image is downloaded once.
+
+    URLs map to the SHA-256 of their content; blobs live in a bounded
+    in-memory LRU and a bounded on-disk directory keyed by that hash.
+    Concurrent requests for the same URL share a single download.
+    get_normalized() stores each URL's embeddable version the same way,
+    under a URL + spec key, so it is transcoded once per album.
+
+    The in-memory URL map keeps the `max_urls` most recently used URLs.
+    Disk eviction removes a blob's URL references along with it, and runs
+    outside the lock so lookups never wait for the directory walk.
+    """
+
+    def __init__(self, directory=DEFAULT_ARTWORK_DIR, memory_bytes=32 * 1024 * 1024,
+                 disk_bytes=512 * 1024 * 1024, max_urls=65536):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_urls = max_urls
+        self.downloads = 0
+        self.hits = 0
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # hash -> bytes
+        self._memory_used = 0
+        self._urls = OrderedDict()  # url -> hash, least recently used first
+        self._inflight = {}  # url -> _Pending
+        self._disk_used = None
+        self._disk_written = 0  # bytes added since start, to reconcile with a scan
+        self._evict_lock = threading.Lock()
+
+        if directory:
+            os.makedirs(os.path.join(directory, 'blobs'), exist_ok=True)
+            os.makedirs(os.path.join(directory, 'urls'), exist_ok=True)
+
+    # ---------------------------------------------------------------- lookup
+    def get(self, url, timeout=10):
+        """Return the image bytes for `url`, downloading at most once"""
+        def download():
+            with METRICS.timer('artwork_fetch'):
+                resp = get_http_client().get(url, timeout=timeout)
+            resp.raise_for_status()
+            with self._lock:
+                self.downloads += 1
+            return resp.content
+        return self._once(url, download)
+
+    def get_normalized(self, url, spec=None, timeout=10):
+        """`url`'s image as a JPEG within `spec` (default get_artwork_spec()), transcoded at most once"""
+        spec = spec or get_artwork_spec()
+
+        def transcode():
+            raw = self.get(url, timeout)
+            with METRICS.timer('artwork_transcode'):
+                data = normalize_artwork(raw, spec)
+            METRICS.inc('artwork_bytes_trimmed', len(raw) - len(data))
+            return data
+        return self._once(f"{url}#{spec_key(spec)}", transcode)
+
+    def _once(self, key, produce):
+        """Cached bytes for `key`, else produce() them; concurrent callers share one produce()"""
+        digest = self._url_hash(key)
+        while True:
+            if digest:
+                data = self.get_by_hash(digest)
+                if data is not None:
+                    with self._lock:
+                        self.hits += 1
+                    METRICS.inc('artwork_cache_hits')
+                    return data
+
+            with self._lock:
+                # An owner that finished since the lookup above has already
+                # mapped the key (put() runs before it leaves _inflight)
+                stored = self._urls.get(key)
+                if stored and stored != digest:
+                    digest = stored
+                    continue
+                pending = self._inflight.get(key)
+                owner = pending is None
+                if owner:
+                    pending = self._inflight[key] = _Pending()
+            break
+
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            with self._lock:
+                self.hits += 1
+            return pending.data
+
+        try:
+            pending.data = produce()
+            self.put(pending.data, key)
+            return pending.data
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.done.set()
+
+    def get_by_hash(self, digest):
+        """Return cached bytes for a content hash, or None"""
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                return data
+
+        path = self._blob_path(digest)
+        if not path:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # recency for disk eviction
+        except OSError:
+            return None
+        self._remember(digest, data)
+        return data
+
+    def put(self, data, url=None):
+        """Store `data` and return its content hash"""
+        digest = content_hash(data)
+        self._remember(digest, data)
+        if url:
+            self._map_url(url, digest)
+        if self.directory:
+            try:
+                self._write_disk(digest, data, url)
+            except OSError as e:
+                debug_log(f'Artwork cache write failed: {e}')
+        return digest
+
+    # ---------------------------------------------------------------- memory tier
+    def _remember(self, digest, data):
+        with self._lock:
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+                return
+            if len(data) > self.memory_bytes:
+                return
+            self._memory[digest] = data
+            self._memory_used += len(data)
+            while self._memory_used > self.memory_bytes:
+                _, old = self._memory.popitem(last=False)
+                self._memory_used -= len(old)
+
+    # ---------------------------------------------------------------- disk tier
+    def _url_ref_path(self, url):
+        return os.path.join(self.directory, 'urls', hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def _blob_path(self, digest):
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, 'blobs', digest)
+
+    def _map_url(self, url, digest):
+        with self._lock:
+            self._urls[url] = digest
+            self._urls.move_to_end(url)
+            while len(self._urls) > self.max_urls:
+                self._urls.popitem(last=False)
+
+    def _url_hash(self, url):
+        with self._lock:
+            digest = self._urls.get(url)
+            if digest:
+                self._urls.move_to_end(url)
+        if digest or not self.directory:
+            return digest
+        try:
+            with open(self._url_ref_path(url), 'r') as f:
+                digest = f.read().strip()
+        except OSError:
+            return None
+        self._map_url(url, digest)
+        return digest
+
+    def _write_disk(self, digest, data, url):
+        path = self._blob_path(digest)
+        added = not os.path.exists(path)
+        if added:
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+            with self._lock:
+                self._disk_written += len(data)
+                if self._disk_used is not None:
+                    self._disk_used += len(data)
+        if url:
+            # Before evicting, so the ref goes with the blob if that is what gets trimmed
+            with open(self._url_ref_path(url), 'w') as f:
+                f.write(digest)
+        if added:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete least recently used blobs, and their URL refs, until the directory fits `disk_bytes`"""
+        with self._lock:
+            if self._disk_used is not None and self._disk_used <= self.disk_bytes:
+                return
+            written = self._disk_written
+        if not self._evict_lock.acquire(blocking=False):
+            return  # another thread is already trimming
+        try:
+            entries = []
+            for entry in os.scandir(os.path.join(self.directory, 'blobs')):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+            used = sum(e[1] for e in entries)
+            evicted = set()
+            if used > self.disk_bytes:
+                entries.sort()
+                for _, size, path in entries:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    used -= size
+                    evicted.add(os.path.basename(path))
+                    if used <= self.disk_bytes:
+                        break
+            with self._lock:
+                # Blobs written during the walk may be counted twice; that only trims sooner
+                self._disk_used = used + self._disk_written - written
+                for url in [u for u, d in self._urls.items() if d in evicted and d not in self._memory]:
+                    del self._urls[url]
+            if evicted:
+                kept = {os.path.basename(e[2]) for e in entries} - evicted
+                self._drop_url_refs(kept)
+                debug_log(f'Artwork cache trimmed {len(evicted)} blobs to', used)
+        finally:
+            self._evict_lock.release()
+
+    def _drop_url_refs(self, kept):
+        """Delete the on-disk URL refs whose blob is gone (`kept`: blobs known to remain)"""
+        for entry in os.scandir(os.path.join(self.directory, 'urls')):
+            try:
+                with open(entry.path, 'r') as f:
+                    digest = f.read().strip()
+                if digest not in kept and not os.path.exists(self._blob_path(digest)):
+                    os.remove(entry.path)
+            except OSError:
+                continue
+
+    def stats(self):
+        with self._lock:
+            return {
+                'downloads': self.downloads,
+                'hits': self.hits,
+                'memory_items': len(self._memory),
+                'memory_bytes': self._memory_used,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_artwork_cache():
+    """Return the process-wide artwork cache, falling back to memory-only if the disk tier is unusable"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ArtworkCache()
+            except OSError as e:
+                debug_log(f'Artwork disk cache disabled: {e}')
+                _cache = ArtworkCache(directory=None)
+        return _cache
+
+
+def set_artwork_cache(cache):
+    """Swap the process-wide cache (e.g. a memory-only one for benchmarks)"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
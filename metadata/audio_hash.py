@@ -0,0 +1,180 @@
+# metadata/audio_hash.py
+import hashlib
+import mmap
+import os
+import threading
+
+READ_CHUNK = 1024 * 1024
+
+
+def _syncsafe(b):
+    return (b[0] << 21) | (b[1] << 14) | (b[2] << 7) | b[3]
+
+
+def audio_span(buf, size):
+    """
+    (start, end) of the audio payload in `buf` (bytes or mmap of the whole
+    file): after a leading ID3v2 tag, before trailing ID3v1, Lyrics3v2 and
+    APEv2 tags.
+    """
+    start, end = 0, size
+    if size >= 10 and buf[0:3] == b'ID3':
+        start = 10 + _syncsafe(buf[6:10]) + (10 if buf[5] & 0x10 else 0)  # 0x10: footer present
+    if end - start >= 128 and buf[end - 128:end - 125] == b'TAG':
+        end -= 128
+    if end - start >= 15 and buf[end - 9:end] == b'LYRICS200':
+        try:
+            end -= int(buf[end - 15:end - 9]) + 15
+        except ValueError:
+            pass
+    if end - start >= 32 and buf[end - 32:end - 24] == b'APETAGEX':
+        ape_size = int.from_bytes(buf[end - 20:end - 16], 'little')  # items + footer
+        ape_flags = int.from_bytes(buf[end - 12:end - 8], 'little')
+        end -= ape_size + (32 if ape_flags & 0x80000000 else 0)  # bit 31: header present
+    return start, max(start, end)
+
+
+def audio_hash(path, use_mmap=True):
+    """
+    BLAKE2b of the audio payload only, so copies that differ just in their
+    tags hash the same. Reads through mmap (no copies into Python) unless
+    use_mmap is False or mapping fails.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return h.hexdigest()
+        if use_mmap:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    start, end = audio_span(mm, size)
+                    with memoryview(mm) as view:
+                        h.update(view[start:end])
+                return h.hexdigest()
+            except (OSError, ValueError):
+                pass  # e.g. special files; fall back to plain reads
+
+        start, end = audio_span(_FileView(f), size)
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(READ_CHUNK, remaining))
+            if not chunk:
+                break
+            h.update(chunk)
+            remaining -= len(chunk)
+    return h.hexdigest()
+
+
+class _FileView:
+    """Just enough slicing over an open file for audio_span, without reading it all"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+        self.f.seek(key.start)
+        return self.f.read(key.stop - key.start)
+
+
+class _Group:
+    def __init__(self, owner):
+        self.owner = owner
+        self.paths = [owner]
+        self.done = threading.Event()
+        self.best = None
+
+
+class AudioDeduper:
+    """
+    Batch-wide groups of byte-identical audio.
+
+    The first file of a group (the owner) is searched and scored as usual;
+    later copies wait for it and take its match when it found one, or are
+    matched on their own tags when it didn't. duplicate_groups() lists
+    every group with more than one file, for the storage report.
+
+    With report_all=True the pipeline also note()s files it skips without
+    matching (journal and index skips), so the report covers every file
+    rather than just the ones processed this run.
+    """
+
+    def __init__(self, report_all=False):
+        self.report_all = report_all
+        self._groups = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def claim(self, digest, path):
+        """Returns (is_owner, group)"""
+        with self._lock:
+            group = self._groups.get(digest)
+            if group is None:
+                group = self._groups[digest] = _Group(path)
+                return True, group
+            group.paths.append(path)
+            if group.owner is None:
+                group.owner = path  # only noted files so far
+                return True, group
+            return False, group
+
+    def note(self, digest, path):
+        """List a file that is not being matched in its group, for the report only"""
+        with self._lock:
+            group = self._groups.get(digest)
+            if group is None:
+                group = self._groups[digest] = _Group(None)
+                group.paths = []
+            group.paths.append(path)
+
+    def resolve(self, group, best=None):
+        """Owner's outcome: the match to share (None if it found none)"""
+        if group.done.is_set():
+            return
+        group.best = best
+        group.done.set()
+
+    def wait(self, group, cancel=None):
+        """Block until the owner resolves (or `cancel` is set); returns its match or None"""
+        while not group.done.wait(0.1):
+            if cancel is not None and cancel.is_set():
+                return None
+        if group.best is not None:
+            with self._lock:
+                self.shared += 1
+        return group.best
+
+    def duplicate_groups(self):
+        with self._lock:
+            return {d: list(g.paths) for d, g in self._groups.items() if len(g.paths) > 1}
+
+    def report(self):
+        """Duplicate groups, largest reclaimable space first"""
+        groups = []
+        for digest, paths in self.duplicate_groups().items():
+            sizes = []
+            for p in paths:
+                try:
+                    sizes.append(os.path.getsize(p))
+                except OSError:
+                    sizes.append(0)
+            groups.append({
+                'audio_hash': digest,
+                'files': paths,
+                'reclaimable_bytes': sum(sizes) - max(sizes),
+            })
+        groups.sort(key=lambda g: g['reclaimable_bytes'], reverse=True)
+        return groups
+
+    def stats(self):
+        dupes = self.duplicate_groups()
+        with self._lock:
+            return {
+                'unique_audio': len(self._groups),
+                'duplicate_groups': len(dupes),
+                'duplicate_files': sum(len(p) - 1 for p in dupes.values()),
+                'shared_matches': self.shared,
+            }
@@ -0,0 +1,102 @@
+# metadata/batch.py
+from metadata.mp3_reader import read_mp3_metadata
+from metadata.apple_music import score_apple_candidates
+from metadata.catalog import ITunesCatalog
+from metadata.records import BatchResult
+from metadata.tag_updater import apply_mp3_metadata
+from utils.helpers import debug_log
+
+DEFAULT_THRESHOLD = 85
+
+
+def new_result(path):
+    return BatchResult(path)
+
+
+# ---- Steps (shared by process_one and the staged pipeline) ----
+def read_step(path):
+    # Scoring never looks at cover art, so keep its bytes on disk
+    return read_mp3_metadata(path, fast=True)
+
+def search_step(mp3, cache=None, catalog=None, threshold=None):
+    """Scored candidates, fetched adaptively (CatalogBackend.find_scored)"""
+    catalog = catalog if catalog is not None else ITunesCatalog(cache)
+    return catalog.find_scored(mp3, threshold)
+
+def score_step(result, mp3, candidates, threshold=DEFAULT_THRESHOLD, dry_run=False):
+    """
+    Score candidates (unless search_step already did) and fill in `result`.
+    Returns the match to write, or None when the file is finished.
+    """
+    if not candidates:
+        result['status'] = 'no_match'
+        return None
+
+    if any('confidence' not in c for c in candidates):
+        score_apple_candidates(mp3, candidates, threshold)
+    scored = [c for c in candidates if c['confidence'] is not None]
+    if not scored:
+        result['status'] = 'skipped'  # nothing could reach the threshold
+        return None
+
+    # Highest confidence wins; ties keep the closest duration
+    best = max(scored, key=lambda c: c['confidence'])
+    result['confidence'] = best['confidence']
+    result['match'] = best
+    if best['confidence'] < threshold:
+        result['status'] = 'skipped'
+        return None
+    if dry_run:
+        result['status'] = 'would_update'
+        return None
+    return best
+
+def write_step(result, best):
+    report = apply_mp3_metadata(result['path'], best)
+    if not report['ok']:
+        result['status'] = 'failed'
+    else:
+        # 'unchanged': the file already carried exactly these tags
+        result['status'] = 'updated' if report['changed'] else 'unchanged'
+    result['bytes_written'] = report['bytes_written']
+
+
+def process_one(path, threshold=DEFAULT_THRESHOLD, dry_run=False, cache=None, catalog=None):
+    """
+    Read → search → score → write for a single file.
+
+    Returns a BatchResult with `path`, `status` (updated, would_update,
+    unchanged, skipped, no_match, failed or error), `confidence` and the
+    chosen `match`; json.dumps it with records.json_default.
+    """
+    result = new_result(path)
+    try:
+        mp3 = read_step(path)
+        candidates = search_step(mp3, cache, catalog, threshold)
+        best = score_step(result, mp3, candidates, threshold, dry_run)
+        if best is not None:
+            write_step(result, best)
+        return result
+    except Exception as e:
+        debug_log(f"Batch error {path}: {e}")
+        result['status'] = 'error'
+        result['error'] = str(e)
+        return result
+
+
+def format_status(result):
+    """Short human-readable status for the batch results table"""
+    status, score = result['status'], result['confidence']
+    if status == 'updated':
+        return f"Updated ({score}%)"
+    if status == 'would_update':
+        return f"Would update ({score}%)"
+    if status == 'skipped':
+        return f"Skipped ({score}%)" if score is not None else "Skipped"
+    if status == 'unchanged':
+        return "Unchanged"
+    if status == 'no_match':
+        return "No match"
+    if status == 'failed':
+        return "Failed"
+    return "Error"
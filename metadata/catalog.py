@@ -0,0 +1,155 @@
+# metadata/catalog.py
+import os
+import re
+
+from metadata.apple_music import (
+    find_apple_candidates, search_apple_albums, lookup_album_tracks, score_apple_candidates
+)
+from utils.helpers import debug_log
+from utils.metrics import METRICS
+
+# Path of a local catalog database to use instead of the iTunes API
+CATALOG_ENV = 'MP3_METADATA_CATALOG'
+# Page sizes tried in turn; a wider page is fetched only while nothing clears the bar
+QUERY_LIMITS = (5, 50)
+# A candidate this good ends the search even without a threshold
+HIGH_CONFIDENCE = 95
+
+_BRACKETS = re.compile(r"\s*[(\[{][^)\]}]*[)\]}]")
+_FEAT = re.compile(r"\s+(?:feat\.?|ft\.?|featuring)\s.*$", re.IGNORECASE)
+_TRACK_PREFIX = re.compile(r"^\s*\d{1,3}\s*[-._)]\s*")
+# In file names a bare leading number is almost always the track number
+_FILE_TRACK_PREFIX = re.compile(r"^\s*\d{1,3}(?:\s*[-._)]\s*|\s+)")
+_SEPARATORS = re.compile(r"[_.\-]+")
+
+
+def _known(value):
+    value = str(value or '').strip()
+    return '' if value == 'Unknown' else value
+
+
+def clean_title(title):
+    """Title without bracketed notes, featured artists or a leading track number"""
+    title = _BRACKETS.sub('', _known(title))
+    title = _FEAT.sub('', title)
+    return _TRACK_PREFIX.sub('', title).strip()
+
+
+def filename_terms(path):
+    """Search words from a file name, e.g. 03_-_artist-some_title.mp3 → artist some title"""
+    stem = os.path.splitext(os.path.basename(path or ''))[0]
+    return ' '.join(_SEPARATORS.sub(' ', _FILE_TRACK_PREFIX.sub('', stem)).split())
+
+
+def search_queries(mp3):
+    """
+    (title, artist) pairs to try in order: the tags as they are, then
+    progressively relaxed fallbacks for when those find nothing: the
+    cleaned title alone, album + artist, and words from the file name
+    """
+    title, artist, album = _known(mp3.get('title')), _known(mp3.get('artist')), _known(mp3.get('album'))
+    queries = [(title, artist), (clean_title(title), ''), (album, artist),
+               (filename_terms(mp3.get('file_path')), '')]
+    seen = set()
+    for q in queries:
+        key = ' '.join(' '.join(q).lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            yield q
+
+
+class CatalogBackend:
+    """
+    Where candidates come from.
+
+    Tracks are returned in the format_apple_track() shape; album search
+    results are iTunes-style collection dicts with at least collectionId,
+    collectionName and artistName.
+    """
+
+    name = 'catalog'
+
+    def find_candidates(self, title, artist, duration_ms=None, limit=50):
+        """Formatted, unscored candidates, closest duration first"""
+        raise NotImplementedError
+
+    def search_albums(self, artist, album, limit=10):
+        raise NotImplementedError
+
+    def album_tracks(self, collection_id, limit=200):
+        """Formatted tracks of one collection in disc/track order"""
+        raise NotImplementedError
+
+    def find_scored(self, mp3, threshold=None, limits=QUERY_LIMITS):
+        """
+        Scored candidates for an MP3 record, fetched adaptively.
+
+        Each query in search_queries() starts with a small page and widens
+        only while no candidate reaches the threshold (or HIGH_CONFIDENCE
+        without one) and the catalog still has more. The first query with
+        any results wins; later ones are only tried when earlier ones come
+        back empty. With a threshold, candidates that cannot reach it get
+        confidence None, as in score_apple_candidates.
+        """
+        bar = min(threshold, HIGH_CONFIDENCE) if threshold is not None else HIGH_CONFIDENCE
+        for n, (title, artist) in enumerate(search_queries(mp3)):
+            if n:
+                METRICS.inc('search_relaxed')
+            for i, limit in enumerate(limits):
+                if i:
+                    METRICS.inc('search_widened')
+                candidates = score_apple_candidates(
+                    mp3, self.find_candidates(title, artist, mp3['duration_ms'], limit), threshold)
+                if len(candidates) < limit:
+                    break  # nothing more to widen into
+                if any(c['confidence'] is not None and c['confidence'] >= bar for c in candidates):
+                    break
+            if candidates:
+                return candidates
+        return []
+
+    def search(self, title, artist, duration_ms=None, full_mp3_meta=None, limit=50):
+        """Scored candidates, like search_apple_music; [] on any error"""
+        try:
+            mp3_for_conf = full_mp3_meta or {
+                'title': title, 'artist': artist, 'duration_ms': duration_ms or 0,
+                'album': '', 'year': '', 'genre': '', 'track': '',
+            }
+            limits = tuple(n for n in QUERY_LIMITS if n < limit) + (limit,)
+            return self.find_scored(mp3_for_conf, limits=limits)
+        except Exception as e:
+            debug_log(f'{self.name} search error: {e}')
+            return []
+
+    def close(self):
+        pass
+
+
+class ITunesCatalog(CatalogBackend):
+    """The iTunes Search/Lookup API, through an optional SearchCache"""
+
+    name = 'itunes'
+
+    def __init__(self, cache=None):
+        self.cache = cache
+
+    def find_candidates(self, title, artist, duration_ms=None, limit=50):
+        return find_apple_candidates(title, artist, duration_ms, self.cache, limit)
+
+    def search_albums(self, artist, album, limit=10):
+        return search_apple_albums(artist, album, self.cache, limit)
+
+    def album_tracks(self, collection_id, limit=200):
+        return lookup_album_tracks(collection_id, self.cache, limit)
+
+
+def get_catalog(cache=None, path=None):
+    """
+    The local catalog at `path` (or $MP3_METADATA_CATALOG) when given,
+    otherwise the iTunes API
+    """
+    path = path or os.environ.get(CATALOG_ENV)
+    if path:
+        from metadata.local_catalog import LocalCatalog
+        return LocalCatalog(path)
+    return ITunesCatalog(cache)
@@ -0,0 +1,120 @@
+# metadata/journal.py
+import hashlib
+import json
+import os
+import threading
+import time
+from utils.helpers import debug_log
+
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.expanduser('~'), '.mp3_metadata_cleaner', 'batch_journal.jsonl')
+JOURNAL_DIR = os.path.join(os.path.expanduser('~'), '.mp3_metadata_cleaner', 'journals')
+
+# Outcomes that need no redo on resume; 'error' and 'failed' are retried
+COMPLETE_STATUSES = ('updated', 'unchanged', 'skipped', 'no_match')
+MATCH_FIELDS = ('title', 'artist', 'album', 'year', 'genre', 'track', 'collection_id', 'album_art_url')
+
+
+def journal_path_for(root):
+    """A journal path of its own for batches over `root` (a folder or file)"""
+    key = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(JOURNAL_DIR, f'batch_{key}.jsonl')
+
+
+class BatchJournal:
+    """
+    Append-only JSONL checkpoint of batch outcomes.
+
+    Records are buffered and written + fsynced every `flush_every` records
+    or `flush_interval` seconds, so a crash loses at most one unflushed
+    batch. A torn last line from a crash is ignored on load.
+    """
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, flush_every=500, flush_interval=5.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.completed = set()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fh = open(path, 'a', encoding='utf-8')
+        self._terminate_torn_line()
+
+    def _terminate_torn_line(self):
+        """Make sure new records don't get glued onto a half-written last line"""
+        if self._fh.tell() == 0:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                self._fh.write('\n')
+                self._fh.flush()
+
+    def load(self, dry_run=False):
+        """Read the existing journal; returns the number of completed files"""
+        statuses = COMPLETE_STATUSES + (('would_update',) if dry_run else ())
+        done = set()
+        with self._lock:
+            self._flush_locked()
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue  # torn write
+                        if entry.get('status') in statuses:
+                            done.add(entry['path'])
+                        else:
+                            done.discard(entry.get('path'))
+            except FileNotFoundError:
+                pass
+            self.completed = done
+        debug_log(f'Journal: {len(done)} completed files in {self.path}')
+        return len(done)
+
+    def is_done(self, path):
+        return path in self.completed
+
+    def record(self, result):
+        match = result.get('match')
+        entry = {
+            'path': result['path'],
+            'status': result['status'],
+            'confidence': result.get('confidence'),
+            'match': {k: match.get(k) for k in MATCH_FIELDS} if match else None,
+            'ts': round(time.time(), 3),
+        }
+        line = json.dumps(entry) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            if (len(self._buffer) >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._buffer:
+            self._fh.write(''.join(self._buffer))
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def clear(self):
+        """Start over: drop buffered records and truncate the file"""
+        with self._lock:
+            self._buffer = []
+            self._fh.truncate(0)
+            self._fh.flush()
+            self.completed = set()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._fh.close()
@@ -0,0 +1,161 @@
+# metadata/library_index.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from metadata.records import json_default
+from utils.helpers import debug_log
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser('~'), '.mp3_metadata_cleaner', 'library_index.sqlite3')
+
+# Outcomes that settle a file until it changes on disk
+MATCHED_STATUSES = ('updated', 'unchanged')
+# Outcomes worth retrying, but not on every run
+UNMATCHED_STATUSES = ('skipped', 'no_match')
+
+TAG_FIELDS = ('title', 'artist', 'album', 'year', 'genre', 'track')
+
+
+def tag_digest(meta):
+    """Stable hash of the tag fields we read and write"""
+    raw = '\x1f'.join(str(meta.get(k, '')).strip() for k in TAG_FIELDS)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class LibraryIndex:
+    """
+    Persistent per-file record of size, mtime, tag digest and last match.
+
+    Lets folder and batch runs skip files that have not changed since they
+    were last matched. Writes are committed in batches; call flush() or
+    close() at the end of a run.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, retry_unmatched_after=30 * 24 * 3600,
+                 commit_every=200):
+        self.path = path
+        self.retry_unmatched_after = retry_unmatched_after
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " tag_digest TEXT,"
+            " status TEXT NOT NULL,"
+            " confidence INTEGER,"
+            " match TEXT,"
+            " updated REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, tag_digest, status, confidence, match, updated"
+                " FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'path': path, 'size': row[0], 'mtime_ns': row[1], 'tag_digest': row[2],
+            'status': row[3], 'confidence': row[4],
+            'match': json.loads(row[5]) if row[5] else None, 'updated': row[6],
+        }
+
+    def _settled(self, entry, include_unmatched):
+        if entry['status'] in MATCHED_STATUSES:
+            return True
+        return (include_unmatched and entry['status'] in UNMATCHED_STATUSES
+                and time.time() - entry['updated'] < self.retry_unmatched_after)
+
+    def is_current(self, path, st=None, include_unmatched=True):
+        """
+        True if `path` is unchanged on disk since a settled outcome was
+        recorded. With include_unmatched=False only a match settles a file,
+        not a recent skip or no_match.
+        """
+        entry = self.get(path)
+        if entry is None or not self._settled(entry, include_unmatched):
+            return False
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return False
+        return st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns']
+
+    def needs_processing(self, path, st=None, include_unmatched=True):
+        return not self.is_current(path, st, include_unmatched)
+
+    def same_tags(self, path, digest):
+        """
+        True if `path` was matched with these exact tags, e.g. a file that
+        was touched or copied but not re-tagged.
+        """
+        entry = self.get(path)
+        return (entry is not None and entry['tag_digest'] == digest
+                and entry['status'] in MATCHED_STATUSES)
+
+    def record(self, result, digest=None):
+        """Store a batch result dict (see metadata.batch.new_result)"""
+        path = os.path.abspath(result['path'])
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        match = result.get('match')
+        if result['status'] == 'updated' and match:
+            digest = tag_digest(match)  # the file now carries the match's tags
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files"
+                " (path, size, mtime_ns, tag_digest, status, confidence, match, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, digest, result['status'],
+                 result.get('confidence'), json.dumps(match, default=json_default) if match else None, time.time())
+            )
+            self._uncommitted += 1
+            if self._uncommitted >= self.commit_every:
+                self._conn.commit()
+                self._uncommitted = 0
+
+    def invalidate(self, prefix=None):
+        """Forget entries under `prefix` (a file or directory), or all entries; returns the count"""
+        with self._lock:
+            if prefix is None:
+                cur = self._conn.execute("DELETE FROM files")
+            else:
+                prefix = os.path.abspath(prefix)
+                under = prefix.rstrip(os.sep) + os.sep
+                cur = self._conn.execute(
+                    "DELETE FROM files WHERE path = ? OR substr(path, 1, ?) = ?",
+                    (prefix, len(under), under)
+                )
+            self._conn.commit()
+            self._uncommitted = 0
+        debug_log(f'Library index invalidated {cur.rowcount} entries')
+        return cur.rowcount
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall()
+        return dict(rows)
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,221 @@
+# metadata/local_catalog.py
+"""
+Offline catalog: a catalog dump imported into SQLite with an FTS5 index.
+
+    python -m metadata.local_catalog CATALOG_DB dump.csv [more.jsonl ...]
+
+Dumps are CSV (header row) or JSONL with the format_apple_track fields:
+title, artist, album, year, genre, track, duration_ms, album_art_url,
+collection_id. Rows without a collection_id are grouped into albums by
+(artist, album).
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+
+from metadata.catalog import CatalogBackend
+from metadata.records import CandidateRecord
+from utils.helpers import debug_log
+
+FIELDS = ('title', 'artist', 'album', 'year', 'genre', 'track', 'duration_ms', 'album_art_url', 'collection_id')
+# bm25 column weights for title, artist, album
+RANK_WEIGHTS = (3.0, 2.0, 1.0)
+IMPORT_BATCH = 5000
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _match_query(*texts):
+    """FTS5 OR-query over the words of `texts`; bm25 puts rows matching more words first"""
+    words = dict.fromkeys(w.lower() for t in texts if t for w in _TOKEN.findall(str(t)))
+    return " OR ".join(f'"{w}"' for w in words)
+
+
+def _int(value):
+    try:
+        return int(str(value).split('/', 1)[0])
+    except (TypeError, ValueError):
+        return None
+
+
+class LocalCatalog(CatalogBackend):
+    """
+    SQLite catalog with an FTS5 index over title, artist and album.
+
+    Each thread gets its own read connection, so concurrent searches run in
+    parallel inside SQLite instead of queueing on one lock. That needs a
+    database file: every ':memory:' connection would be a separate, empty
+    database.
+    """
+
+    name = 'local'
+
+    def __init__(self, path):
+        if path == ':memory:':
+            raise ValueError("LocalCatalog needs a database file, not ':memory:'")
+        self.path = path
+        self._local = threading.local()
+        self._conns = []  # every thread's connection, for close()
+        self._conns_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS tracks ("
+            " id INTEGER PRIMARY KEY,"
+            " title TEXT NOT NULL, artist TEXT NOT NULL, album TEXT NOT NULL,"
+            " year INTEGER, genre TEXT, track INTEGER, duration_ms INTEGER,"
+            " album_art_url TEXT, collection_id INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS tracks_collection ON tracks (collection_id, track);"
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5("
+            " title, artist, album, content='tracks', content_rowid='id',"
+            " tokenize='unicode61 remove_diacritics 2');"
+        )
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Used by this thread only; close() may run on another
+            conn = self._local.conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    # ---- Import ----
+    @staticmethod
+    def _row(record):
+        artist, album = str(record.get('artist') or ''), str(record.get('album') or '')
+        collection_id = _int(record.get('collection_id'))
+        if collection_id is None:
+            collection_id = zlib.crc32(f"{artist.lower()}|{album.lower()}".encode('utf-8'))
+        return (
+            str(record.get('title') or ''), artist, album,
+            _int(record.get('year')), record.get('genre') or '', _int(record.get('track')),
+            _int(record.get('duration_ms')) or 0, record.get('album_art_url') or '', collection_id,
+        )
+
+    @staticmethod
+    def _records(path):
+        with open(path, newline='', encoding='utf-8') as f:
+            if path.lower().endswith(('.jsonl', '.json')):
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                yield from csv.DictReader(f)
+
+    def import_file(self, path):
+        """Append a CSV/JSONL dump and refresh the index; returns the row count"""
+        conn = self._conn()
+        count, batch = 0, []
+        sql = f"INSERT INTO tracks ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})"
+        for record in self._records(path):
+            batch.append(self._row(record))
+            if len(batch) >= IMPORT_BATCH:
+                conn.executemany(sql, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            conn.executemany(sql, batch)
+            count += len(batch)
+        conn.execute("INSERT INTO tracks_fts(tracks_fts) VALUES ('rebuild')")
+        conn.commit()
+        debug_log(f'Local catalog: imported {count} tracks from {path}')
+        return count
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM tracks")
+        conn.execute("INSERT INTO tracks_fts(tracks_fts) VALUES ('rebuild')")
+        conn.commit()
+
+    # ---- Lookup ----
+    @staticmethod
+    def _format(row):
+        return CandidateRecord(
+            title=row['title'],
+            artist=row['artist'],
+            album=row['album'],
+            year=row['year'] if row['year'] is not None else 'Unknown',
+            genre=row['genre'] or 'Unknown',
+            track=row['track'] if row['track'] is not None else 'Unknown',
+            duration_ms=row['duration_ms'],
+            album_art_url=row['album_art_url'],
+            collection_id=row['collection_id'],
+        )
+
+    def _match(self, query, limit):
+        if not query:
+            return []
+        return self._conn().execute(
+            "SELECT t.* FROM tracks_fts JOIN tracks t ON t.id = tracks_fts.rowid"
+            " WHERE tracks_fts MATCH ? ORDER BY bm25(tracks_fts, ?, ?, ?) LIMIT ?",
+            (query, *RANK_WEIGHTS, limit)
+        ).fetchall()
+
+    def find_candidates(self, title, artist, duration_ms=None, limit=50):
+        tracks = [self._format(r) for r in self._match(_match_query(title, artist), limit)]
+        if duration_ms is not None:
+            tracks.sort(key=lambda t: abs(t['duration_ms'] - duration_ms))
+        return tracks
+
+    def search_albums(self, artist, album, limit=10):
+        query = _match_query(album, artist)
+        if not query:
+            return []
+        # Best-ranked tracks, folded into their collections in rank order
+        albums = {}
+        for r in self._match(f"{{album artist}}: ({query})", limit * 25):
+            entry = albums.get(r['collection_id'])
+            if entry is None:
+                if len(albums) == limit:
+                    continue
+                entry = albums[r['collection_id']] = {
+                    'wrapperType': 'collection', 'collectionId': r['collection_id'],
+                    'collectionName': r['album'], 'artistName': r['artist'], 'trackCount': 0,
+                }
+            entry['trackCount'] += 1
+        return list(albums.values())
+
+    def album_tracks(self, collection_id, limit=200):
+        rows = self._conn().execute(
+            "SELECT * FROM tracks WHERE collection_id = ? ORDER BY track LIMIT ?", (collection_id, limit)
+        ).fetchall()
+        return [self._format(r) for r in rows]
+
+    def stats(self):
+        return {'tracks': self._conn().execute("SELECT COUNT(*) FROM tracks").fetchone()[0]}
+
+    def close(self):
+        """Close every thread's connection; call once searches are done"""
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument('db', help="catalog database to create or extend")
+    p.add_argument('dumps', nargs='+', help="CSV or JSONL files")
+    p.add_argument('--replace', action='store_true', help="drop existing tracks first")
+    args = p.parse_args(argv)
+    catalog = LocalCatalog(args.db)
+    if args.replace:
+        catalog.clear()
+    for path in args.dumps:
+        print(f"{path}: {catalog.import_file(path)} tracks", file=sys.stderr)
+    print(f"{args.db}: {catalog.stats()['tracks']} tracks", file=sys.stderr)
+    catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,72 @@
 # metadata/mp3_reader.py
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3
-from utils.helpers import safe_decode, debug_log, format_duration
+import concurrent.futures
+import itertools
+import os
+import struct
+import time
+from mutagen.mp3 import MP3, MPEGInfo
+from mutagen.id3 import ID3, TCON, ParseID3v1
+from utils import helpers
+from utils.helpers import safe_decode, debug_log
+from metadata.records import TrackRecord
+from utils.metrics import METRICS
 from io import BytesIO
 from PIL import Image
 
+# ID3 frame → metadata key. TDRC is the v2.4 replacement for TYER.
+TEXT_FRAMES = {
+    b'TIT2': 'title',
+    b'TPE1': 'artist',
+    b'TALB': 'album',
+    b'TYER': 'year',
+    b'TDRC': 'year',
+    b'TCON': 'genre',
+    b'TRCK': 'track',
+}
+TEXT_ENCODINGS = {0: 'latin-1', 1: 'utf-16', 2: 'utf-16-be', 3: 'utf-8'}
+# Extra bytes read before a trailing ID3v1 tag, for tags written a few bytes short
+ID3V1_SLACK = b'APETAGEX'.index(b'TAG')
+# How mutagen keys an APIC frame with no description
+PLAIN_APIC_KEYS = ('APIC', 'APIC:')
+
+
+class CoverArtRef:
+    """
+    Where a file's front cover lives, without holding its bytes.
+
+    `offset`/`length` locate the raw picture data; when they are None
+    (tags the fast reader cannot walk) load() falls back to mutagen.
+    """
+    __slots__ = ('path', 'offset', 'length')
+
+    def __init__(self, path, offset=None, length=None):
+        self.path = path
+        self.offset = offset
+        self.length = length
+
+    def load(self):
+        if self.offset is None:
+            return _extract_cover(ID3(self.path))
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            return f.read(self.length)
+
+    def __repr__(self):
+        return f"CoverArtRef({self.path!r}, offset={self.offset}, length={self.length})"
+
+
+def get_cover_art(metadata):
+    """Return cover bytes from either an eager read or a lazy CoverArtRef"""
+    if metadata.get('cover_art_data'):
+        return metadata['cover_art_data']
+    ref = metadata.get('cover_art')
+    if ref is not None:
+        try:
+            return ref.load()
+        except Exception as e:
+            debug_log(f'Error loading cover art: {e}')
+    return None
+
 def _extract_cover(tags):
     """Return front-cover (type 3) bytes, regardless of key name."""
     for key in tags.keys():
@@ -13,33 +75,249 @@ def _extract_cover(tags):
             if getattr(apic, 'type', None) == 3:
                 debug_log('Found front cover', key)
                 return apic.data
+    # Fallback for ancient files that only have a plain APIC (no description)
+    for key in PLAIN_APIC_KEYS:
+        if key in tags:
+            debug_log('Using plain cover', key)
+            return tags[key].data
     debug_log('No front cover found')
     return None
 
-def read_mp3_metadata(file_path):
+def _syncsafe(b):
+    return (b[0] << 21) | (b[1] << 14) | (b[2] << 7) | b[3]
+
+def _decode_text(data):
+    """First value of an ID3 text frame body (encoding byte + text)"""
+    if not data:
+        return ''
+    encoding = TEXT_ENCODINGS.get(data[0], 'latin-1')
+    text = data[1:].decode(encoding, errors='replace')
+    return text.split('\x00', 1)[0]
+
+def _apic_header_len(head, frame_size):
+    """Bytes before the picture data in an APIC body, or None if `head` is too short"""
+    if len(head) < 4:
+        return None
+    wide = head[0] in (1, 2)
+    mime_end = head.find(b'\x00', 1)
+    if mime_end < 0:
+        return None
+    pos = mime_end + 2  # skip NUL and picture type
+    if wide:
+        # UTF-16 description ends at an aligned double NUL
+        while pos + 1 < len(head):
+            if head[pos] == 0 and head[pos + 1] == 0:
+                return pos + 2 if pos + 2 <= frame_size else None
+            pos += 2
+        return None
+    desc_end = head.find(b'\x00', pos)
+    return desc_end + 1 if 0 <= desc_end < frame_size else None
+
+def _apic_type(head):
+    mime_end = head.find(b'\x00', 1)
+    return head[mime_end + 1] if 0 <= mime_end < len(head) - 1 else None
+
+def _apic_plain(head, hlen):
+    """Whether the APIC's description is empty (mutagen's plain 'APIC:' key)"""
+    mime_end = head.find(b'\x00', 1)
+    return _decode_text(head[:1] + head[mime_end + 2:hlen]) == ''
+
+def _scan_id3(f, path):
+    """
+    Walk an ID3v2.3/2.4 tag, decoding only TEXT_FRAMES and locating the
+    front cover without reading it.
+
+    Returns (fields, cover_ref, audio_offset), or None when the tag uses
+    features (v2.2, unsynchronisation, compressed/encrypted frames) that
+    need mutagen's full parser.
+    """
+    header = f.read(10)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return {}, None, 0
+
+    major, flags = header[3], header[5]
+    tag_size = _syncsafe(header[6:10])
+    audio_offset = 10 + tag_size + (10 if flags & 0x10 else 0)
+    if major not in (3, 4) or flags & 0x80:
+        return None
+
+    pos = 10
+    if flags & 0x40:  # extended header
+        ext = f.read(4)
+        pos += _syncsafe(ext) if major == 4 else 4 + struct.unpack('>I', ext)[0]
+        f.seek(pos)
+
+    fields, cover, plain = {}, None, None
+    end = 10 + tag_size
+    while pos + 10 <= end:
+        fh = f.read(10)
+        if len(fh) < 10 or fh[0] == 0:
+            break  # padding
+        frame_id = fh[:4]
+        size = _syncsafe(fh[4:8]) if major == 4 else struct.unpack('>I', fh[4:8])[0]
+        body = pos + 10
+        if size <= 0 or body + size > end:
+            break
+
+        wanted = frame_id in TEXT_FRAMES or (frame_id == b'APIC' and cover is None)
+        if wanted:
+            # v2.4: compression/encryption/unsync/length-indicator; v2.3: compression/encryption
+            if fh[9] & (0x0F if major == 4 else 0xC0):
+                return None
+            if frame_id == b'APIC':
+                head = f.read(min(size, 512))
+                hlen = _apic_header_len(head, size)
+                if hlen is None:
+                    return None
+                if _apic_type(head) == 3:
+                    cover = CoverArtRef(path, body + hlen, size - hlen)
+                elif plain is None and _apic_plain(head, hlen):
+                    plain = CoverArtRef(path, body + hlen, size - hlen)
+            else:
+                key = TEXT_FRAMES[frame_id]
+                value = _decode_text(f.read(size))
+                if frame_id == b'TCON' and value:
+                    # Resolve ID3v1 references like "(17)" the same way mutagen does
+                    value = (TCON(encoding=3, text=value).genres or [value])[0]
+                # Like mutagen's v2.4 upgrade, TDRC wins over TYER
+                if value and (key not in fields or frame_id == b'TDRC'):
+                    fields[key] = value[:4] if key == 'year' else value
+
+        pos = body + size
+        f.seek(pos)
+
+    return fields, cover or plain, audio_offset
+
+def _scan_id3v1(f):
+    """
+    Fields from a trailing ID3v1 tag, found and parsed the way mutagen does
+    (ParseID3v1), or {} when there is none
+    """
+    f.seek(0, 2)
+    f.seek(max(0, f.tell() - 128 - ID3V1_SLACK))
+    data = f.read()
+    idx, ape = data.find(b'TAG'), data.find(b'APETAGEX')
+    if idx < 0 or (ape >= 0 and idx == ape + ID3V1_SLACK):
+        return {}  # no tag, or the TAG inside an APEv2 footer
+    frames = ParseID3v1(data[idx:]) or {}
+    fields = {}
+    for frame_id, frame in frames.items():
+        key = TEXT_FRAMES.get(frame_id.encode('ascii'))
+        if key is None:
+            continue
+        value = frame.genres[0] if frame_id == 'TCON' and frame.genres else str(frame.text[0])
+        fields[key] = value[:4] if key == 'year' else value
+    return fields
+
+def _read_fast(file_path):
+    with open(file_path, 'rb') as f:
+        scanned = _scan_id3(f, file_path)
+        if scanned is None:
+            return None
+        fields, cover, audio_offset = scanned
+        info = MPEGInfo(f, audio_offset)
+        # Like mutagen, an ID3v1 tag fills in what the v2 tag lacks
+        for key, value in _scan_id3v1(f).items():
+            fields.setdefault(key, value)
+
+    return TrackRecord(
+        file_path, int(info.length * 1000), cover_art=cover,
+        **{key: fields[key] for key in ('title', 'artist', 'album', 'year', 'genre', 'track') if fields.get(key)}
+    )
+
+def read_mp3_metadata(file_path, fast=False):
+    """
+    Read tags and duration from an MP3 into a TrackRecord.
+
+    With fast=True only the ID3 header, the text frames above, the first
+    MPEG frame and any trailing ID3v1 tag are parsed; cover art is returned as a lazy `cover_art`
+    CoverArtRef instead of eager `cover_art_data` bytes (see get_cover_art).
+    """
+    with METRICS.timer('tag_read'):
+        return _read_mp3_metadata(file_path, fast)
+
+def _read_mp3_metadata(file_path, fast):
     try:
+        if fast:
+            metadata = _read_fast(file_path)
+            if metadata is not None:
+                return metadata
+            debug_log('Fast read unsupported, using full parser', file_path)
+
         audio = MP3(file_path)
         tags = audio.tags if audio.tags else ID3()
 
         cover = _extract_cover(tags)
-        # Fallback for ancient files that only have plain APIC
-        if cover is None and 'APIC' in tags:
-            cover = tags['APIC'].data
-
-        metadata = {
-            'title': safe_decode(tags.get('TIT2', [b'Unknown'])[0]) if tags.get('TIT2') else 'Unknown',
-            'artist': safe_decode(tags.get('TPE1', [b'Unknown'])[0]) if tags.get('TPE1') else 'Unknown',
-            'album': safe_decode(tags.get('TALB', [b'Unknown'])[0]) if tags.get('TALB') else 'Unknown',
-            'year': safe_decode(tags.get('TYER', [b'Unknown'])[0]) if tags.get('TYER') else 'Unknown',
-            'genre': safe_decode(tags.get('TCON', [b'Unknown'])[0]) if tags.get('TCON') else 'Unknown',
-            'track': safe_decode(tags.get('TRCK', [b'Unknown'])[0]) if tags.get('TRCK') else 'Unknown',
-            'file_path': file_path,
-            'duration_ms': int(audio.info.length * 1000),
-            'duration': format_duration(int(audio.info.length * 1000)),
-            'cover_art_data': cover,
-        }
+
+        year = tags.get('TYER') or tags.get('TDRC')
+
+        metadata = TrackRecord(
+            file_path, int(audio.info.length * 1000), cover_art_data=cover,
+            title=safe_decode(tags.get('TIT2', [b'Unknown'])[0]) if tags.get('TIT2') else 'Unknown',
+            artist=safe_decode(tags.get('TPE1', [b'Unknown'])[0]) if tags.get('TPE1') else 'Unknown',
+            album=safe_decode(tags.get('TALB', [b'Unknown'])[0]) if tags.get('TALB') else 'Unknown',
+            year=safe_decode(year[0])[:4] if year else 'Unknown',
+            genre=safe_decode(tags.get('TCON', [b'Unknown'])[0]) if tags.get('TCON') else 'Unknown',
+            track=safe_decode(tags.get('TRCK', [b'Unknown'])[0]) if tags.get('TRCK') else 'Unknown',
+        )
+
+        if fast:
+            # Still keep cover bytes out of batch memory
+            metadata.cover_art_data = None
+            metadata.cover_art = CoverArtRef(file_path) if cover else None
 
         return metadata
     except Exception as e:
         debug_log(f'Error reading MP3: {e}')
-        raise
\ No newline at end of file
+        raise
+
+
+def _init_reader(debug):
+    """Process-pool initializer: inherit the caller's debug flag"""
+    helpers.DEBUG = debug
+
+def _read_chunk(paths):
+    """
+    Process-pool worker: fast-read a chunk into (path, metadata, error)
+    tuples, plus per-file read times for the parent's metrics
+    """
+    out, timings = [], []
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            out.append((path, _read_mp3_metadata(path, True), None))
+        except Exception as e:
+            out.append((path, None, str(e)))
+        timings.append(time.perf_counter() - start)
+    return out, timings
+
+def read_many(paths, workers=None, chunksize=64):
+    """
+    Fast-read `paths` across a process pool, yielding (path, metadata, error)
+    as chunks complete.
+
+    ID3/MPEG parsing is pure Python and holds the GIL, so threads don't
+    scale it; processes do. Records are the compact fast-mode dicts (cover
+    art as a CoverArtRef, never bytes) so they pickle cheaply. `paths` is
+    consumed lazily with at most 2 chunks per worker in flight. `workers`
+    defaults to the CPU count.
+    """
+    workers = workers or os.cpu_count() or 1
+    paths = iter(paths)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_reader,
+                                                initargs=(helpers.DEBUG,)) as pool:
+        pending = set()
+        while True:
+            while len(pending) < workers * 2:
+                chunk = list(itertools.islice(paths, chunksize))
+                if not chunk:
+                    break
+                pending.add(pool.submit(_read_chunk, chunk))
+            if not pending:
+                return
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for f in done:
+                records, timings = f.result()
+                for elapsed in timings:
+                    METRICS.observe('tag_read', elapsed)
+                yield from records
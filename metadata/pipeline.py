@@ -0,0 +1,352 @@
+# metadata/pipeline.py
+import queue
+import threading
+import time
+
+from metadata.artwork_cache import get_artwork_cache
+from metadata.audio_hash import audio_hash
+from metadata.batch import (
+    DEFAULT_THRESHOLD, new_result, read_step, search_step, score_step, write_step
+)
+from metadata.catalog import ITunesCatalog
+from metadata.library_index import tag_digest
+from metadata.mp3_reader import read_many
+from metadata.write_scheduler import WriteScheduler
+from utils.helpers import debug_log
+from utils.metrics import METRICS
+
+_DONE = object()
+
+
+class Stage:
+    """One pipeline stage: a bounded inbox served by `workers` threads"""
+
+    def __init__(self, name, func, workers, queue_size):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.processed = 0
+        self.busy_s = 0.0
+        self._live = self.workers
+        self._lock = threading.Lock()
+
+    def record(self, elapsed):
+        with self._lock:
+            self.processed += 1
+            self.busy_s += elapsed
+
+    def worker_exited(self):
+        """Returns True for the last worker of this stage to exit"""
+        with self._lock:
+            self._live -= 1
+            return self._live == 0
+
+
+class BatchPipeline:
+    """
+    Staged batch: read → search → score → write.
+
+    Each stage has its own thread count and a bounded queue in front of it,
+    so disk-bound reads/writes overlap network-bound searches while memory
+    stays flat regardless of library size. `run()` yields each file's result
+    dict as soon as it finishes.
+
+    With a LibraryIndex, files unchanged since they were last matched are
+    skipped before they are read (counted in `unchanged`), files whose tags
+    still match a recorded match finish as 'unchanged' after the read, and
+    every outcome is recorded, except in a dry run (which must not replace
+    a real write's entry). force=True re-matches everything.
+
+    With an AlbumMatcher, files are first assigned from their album's
+    track list and only fall back to a per-track search when that fails.
+
+    With a BatchJournal, every outcome is checkpointed and files the
+    journal already lists as complete are skipped (counted in `resumed`).
+
+    Candidates come from `catalog` (a CatalogBackend), by default the
+    iTunes API through `cache`.
+
+    With read_processes > 0, tags are parsed in a process pool of that
+    size and the read stage threads only do the index bookkeeping.
+
+    With an AudioDeduper, files are grouped by audio_hash(): only the first
+    file of each group is searched and scored, and the other copies take
+    its match (recorded as `duplicate_of`) instead of searching again.
+    With its report_all set, skipped files are hashed into the report too.
+
+    Tag saves go through a WriteScheduler: at most `writes_per_device`
+    at a time per disk or mount, in directory/inode order, with the
+    artwork downloaded and normalized before the device slot is taken.
+
+    With a WorkQueue, every outcome (including journal and index skips)
+    is reported to it, so run(work_queue.claims()) works a shared queue.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, dry_run=False, cache=None,
+                 read_workers=2, search_workers=4, score_workers=1, write_workers=2,
+                 queue_size=32, index=None, force=False, albums=None, journal=None,
+                 read_processes=0, catalog=None, dedupe=None, work_queue=None, writes_per_device=1):
+        self.threshold = threshold
+        self.dry_run = dry_run
+        self.cache = cache
+        self.catalog = catalog if catalog is not None else ITunesCatalog(cache)
+        self.index = index
+        self.force = force
+        self.albums = albums
+        self.journal = journal
+        self.read_processes = read_processes
+        self.dedupe = dedupe
+        self.work_queue = work_queue
+        self.stages = [
+            Stage('read', self._read, read_workers, queue_size),
+            Stage('search', self._search, search_workers, queue_size),
+            Stage('score', self._score, score_workers, queue_size),
+            Stage('write', self._write, write_workers, queue_size),
+        ]
+        self.writes = self.stages[-1].inbox = WriteScheduler(_DONE, queue_size, writes_per_device)
+        self.results = queue.Queue(maxsize=queue_size)
+        self.fed = 0
+        self.unchanged = 0
+        self.resumed = 0
+        self.bytes_written = 0
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._started = None
+
+    # ---- Stage functions: return True to pass the item downstream ----
+    def _read(self, item):
+        result = item['result']
+        if 'read_error' in item:
+            raise RuntimeError(item.pop('read_error'))
+        if 'mp3' not in item:
+            item['mp3'] = read_step(result['path'])
+        if self.index is not None:
+            item['digest'] = tag_digest(item['mp3'])
+            if not self.force and self.index.same_tags(result['path'], item['digest']):
+                entry = self.index.get(result['path'])
+                result.update(status='unchanged', confidence=entry['confidence'], match=entry['match'])
+                self._note_skipped(result['path'])
+                return False
+        if self.dedupe is not None:
+            item['audio_hash'] = audio_hash(result['path'])
+        return True
+
+    def _search(self, item):
+        if self.dedupe is not None:
+            owner, group = self.dedupe.claim(item['audio_hash'], item['result']['path'])
+            if owner:
+                item['dedupe_group'] = group
+            else:
+                shared = self.dedupe.wait(group, self._cancel)
+                if shared is not None:
+                    item['shared'] = shared
+                    item['result']['duplicate_of'] = group.owner
+                    return True
+                # the owner found nothing usable; these tags may do better
+        if self.albums is not None:
+            assigned = self.albums.match(item['mp3'], self.threshold)
+            if assigned:
+                item['candidates'] = assigned
+                return True
+        item['candidates'] = search_step(item['mp3'], catalog=self.catalog, threshold=self.threshold)
+        return True
+
+    def _score(self, item):
+        result = item['result']
+        if 'shared' in item:
+            best = item.pop('shared')
+            result.update(confidence=best['confidence'], match=best)
+            if self.dry_run:
+                result['status'] = 'would_update'
+                return False
+            item['best'] = best
+            return True
+
+        item['best'] = score_step(result, item.pop('mp3'), item.pop('candidates'),
+                                  self.threshold, self.dry_run)
+        group = item.pop('dedupe_group', None)
+        if group is not None:
+            matched = result['confidence'] is not None and result['confidence'] >= self.threshold
+            self.dedupe.resolve(group, result['match'] if matched else None)
+        return item['best'] is not None
+
+    def _write(self, item):
+        best = item.pop('best')
+        if best.get('album_art_url'):
+            try:
+                get_artwork_cache().get_normalized(best['album_art_url'], timeout=10)
+            except Exception:
+                pass  # apply_mp3_metadata tries again and reports the failure
+        with self.writes.slot(item):
+            write_step(item['result'], best)
+        with self._lock:
+            self.bytes_written += item['result']['bytes_written']
+        return True
+
+    # ---- Plumbing ----
+    def _pending(self, paths):
+        """Paths that still need work, after journal and index skips"""
+        for path in paths:
+            if self._cancel.is_set():
+                return
+            if self.journal is not None and self.journal.is_done(path):
+                self.resumed += 1
+                METRICS.inc('files_resumed')
+                if self.work_queue is not None:
+                    self.work_queue.complete(path, 'resumed')
+                self._note_skipped(path)
+                continue
+            if self.index is not None and not self.force and self.index.is_current(path):
+                self.unchanged += 1
+                METRICS.inc('files_index_current')
+                if self.work_queue is not None:
+                    self.work_queue.complete(path, 'unchanged')
+                self._note_skipped(path)
+                continue
+            yield path
+
+    def _note_skipped(self, path):
+        """Hash a file that skips matching, if the deduper reports on every file"""
+        if self.dedupe is None or not self.dedupe.report_all:
+            return
+        try:
+            self.dedupe.note(audio_hash(path), path)
+        except OSError as e:
+            debug_log(f'Could not hash {path}: {e}')
+
+    def _feed(self, paths):
+        first = self.stages[0]
+        try:
+            if self.read_processes > 0:
+                for path, mp3, error in read_many(self._pending(paths), self.read_processes):
+                    item = {'result': new_result(path)}
+                    if error is None:
+                        item['mp3'] = mp3
+                    else:
+                        item['read_error'] = error
+                    first.inbox.put(item)
+                    self.fed += 1
+            else:
+                for path in self._pending(paths):
+                    first.inbox.put({'result': new_result(path)})
+                    self.fed += 1
+        except Exception as e:
+            debug_log(f"Pipeline feed error: {e}")
+        finally:
+            for _ in range(first.workers):
+                first.inbox.put(_DONE)
+
+    def _work(self, stage, nxt):
+        while True:
+            item = stage.inbox.get()
+            if item is _DONE:
+                if stage.worker_exited():
+                    if nxt is None:
+                        self.results.put(_DONE)
+                    else:
+                        for _ in range(nxt.workers):
+                            nxt.inbox.put(_DONE)
+                return
+            if self._cancel.is_set():
+                continue  # drain without doing work
+
+            start = time.perf_counter()
+            try:
+                forward = stage.func(item)
+            except Exception as e:
+                debug_log(f"Batch error {item['result']['path']} ({stage.name}): {e}")
+                item['result']['status'] = 'error'
+                item['result']['error'] = str(e)
+                forward = False
+            elapsed = time.perf_counter() - start
+            stage.record(elapsed)
+            METRICS.observe(f'stage_{stage.name}', elapsed)
+
+            if forward and nxt is not None:
+                nxt.inbox.put(item)
+            else:
+                self._finish(item)
+
+    def _finish(self, item):
+        group = item.pop('dedupe_group', None)
+        if group is not None:
+            self.dedupe.resolve(group)  # failed before scoring: release the copies
+        METRICS.inc(f"files_{item['result']['status']}")
+        if self.index is not None and not self.dry_run:
+            try:
+                self.index.record(item['result'], item.get('digest'))
+            except Exception as e:
+                debug_log(f"Library index error: {e}")
+        if self.journal is not None:
+            self.journal.record(item['result'])
+        if self.work_queue is not None:
+            try:
+                self.work_queue.complete(item['result']['path'], item['result']['status'],
+                                         item['result']['confidence'])
+            except Exception as e:
+                debug_log(f"Work queue error: {e}")  # the lease expires and another worker retries
+        self.results.put(item['result'])
+
+    def run(self, paths):
+        """Process `paths` (any iterable, consumed lazily) and yield results as they complete"""
+        self._started = time.monotonic()
+        threads = [threading.Thread(target=self._feed, args=(paths,), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            nxt = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            threads += [threading.Thread(target=self._work, args=(stage, nxt), daemon=True)
+                        for _ in range(stage.workers)]
+        for t in threads:
+            t.start()
+
+        finished = False
+        try:
+            while True:
+                result = self.results.get()
+                if result is _DONE:
+                    finished = True
+                    if self.index is not None:
+                        self.index.flush()
+                    if self.journal is not None:
+                        self.journal.flush()
+                    if self.work_queue is not None:
+                        self.work_queue.flush()
+                    return
+                yield result
+        finally:
+            if not finished:
+                # Consumer stopped early: stop feeding and let the stages drain
+                self.cancel()
+                threading.Thread(target=self._drain_results, daemon=True).start()
+
+    def _drain_results(self):
+        while self.results.get() is not _DONE:
+            pass
+
+    def cancel(self):
+        self._cancel.set()
+
+    # ---- Reporting ----
+    def stats(self):
+        """Per-stage queue depth, completed count and throughput"""
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return {
+            s.name: {
+                'queue': s.inbox.qsize(),
+                'processed': s.processed,
+                'per_sec': round(s.processed / elapsed, 2) if elapsed else 0.0,
+                'busy_s': round(s.busy_s, 2),
+            }
+            for s in self.stages
+        }
+
+    def format_stats(self):
+        return " | ".join(
+            f"{name} {st['processed']} ({st['per_sec']}/s, q={st['queue']})"
+            for name, st in self.stats().items()
+        ) + f" | {self.bytes_written / 1e6:.1f} MB written ({self.write_rate():.2f} MB/s)"
+
+    def write_rate(self):
+        """MB/s written across all devices since the run started"""
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return self.bytes_written / 1e6 / elapsed if elapsed else 0.0
@@ -0,0 +1,153 @@
+# metadata/records.py
+from utils.helpers import format_duration
+
+UNKNOWN = 'Unknown'
+
+
+class Record:
+    """
+    Base for the slotted metadata records.
+
+    Fields are attributes, but a record also reads like the dict it
+    replaces (record['title'], record.get(...), 'confidence' in record,
+    dict(record)), so code written against dicts keeps working. Like dict
+    keys, fields that were never assigned are absent: record[key] raises
+    KeyError, get() returns the default and keys() skips them. Derived
+    display fields (DERIVED) are computed on access instead of being
+    stored. Item access only reaches FIELDS and DERIVED, never methods.
+    """
+    __slots__ = ()
+    FIELDS = ()  # every slot, base classes first; filled in per subclass
+    DERIVED = ()
+    _KEYS = frozenset()  # FIELDS + DERIVED
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = tuple(f for c in reversed(cls.__mro__) for f in c.__dict__.get('__slots__', ()))
+        cls._KEYS = frozenset(cls.FIELDS + cls.DERIVED)
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(f"{type(self).__name__} has no field {key!r}")
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        if key not in self._KEYS:
+            return default
+        return getattr(self, key, default)
+
+    def __contains__(self, key):
+        return key in self._KEYS and hasattr(self, key)
+
+    def keys(self):
+        return [k for k in self.FIELDS if hasattr(self, k)] + list(self.DERIVED)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def update(self, other=(), **fields):
+        for key, value in dict(other, **fields).items():
+            self[key] = value
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.keys()}
+
+    def copy(self):
+        new = object.__new__(type(self))
+        for k in self.FIELDS:
+            if hasattr(self, k):
+                setattr(new, k, getattr(self, k))
+        return new
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class _Tagged(Record):
+    """The tag fields MP3 files and catalog tracks share; 'Unknown' when missing"""
+    __slots__ = ('title', 'artist', 'album', 'year', 'genre', 'track', 'duration_ms')
+    DERIVED = ('duration',)
+
+    def __init__(self, title=UNKNOWN, artist=UNKNOWN, album=UNKNOWN, year=UNKNOWN,
+                 genre=UNKNOWN, track=UNKNOWN, duration_ms=0):
+        self.title = title
+        self.artist = artist
+        self.album = album
+        self.year = year
+        self.genre = genre
+        self.track = track
+        self.duration_ms = duration_ms
+
+    @property
+    def duration(self):
+        """m:ss display string"""
+        return format_duration(self.duration_ms)
+
+
+class TrackRecord(_Tagged):
+    """
+    Tags and duration read from one MP3 (see read_mp3_metadata).
+
+    Cover art is either eager `cover_art_data` bytes or, from fast reads,
+    a lazy `cover_art` CoverArtRef; use get_cover_art() for either.
+    """
+    __slots__ = ('file_path', 'cover_art_data', 'cover_art')
+
+    def __init__(self, file_path, duration_ms=0, cover_art_data=None, cover_art=None, **tags):
+        super().__init__(duration_ms=duration_ms, **tags)
+        self.file_path = file_path
+        self.cover_art_data = cover_art_data
+        self.cover_art = cover_art
+
+
+class CandidateRecord(_Tagged):
+    """
+    One catalog track (see format_apple_track). `confidence` is absent
+    until the candidate is scored, and None when it cannot reach the
+    threshold it was scored against (and is not its search's best).
+    """
+    __slots__ = ('album_art_url', 'collection_id', 'confidence')
+
+    def __init__(self, album_art_url='', collection_id=None, **tags):
+        super().__init__(**tags)
+        self.album_art_url = album_art_url
+        self.collection_id = collection_id
+
+
+class BatchResult(Record):
+    """
+    One file's batch outcome (see metadata.batch.new_result). `error`,
+    `bytes_written` and `duplicate_of` are only present when they apply.
+    """
+    __slots__ = ('path', 'status', 'confidence', 'match', 'error', 'bytes_written', 'duplicate_of')
+
+    def __init__(self, path, status='error', confidence=None, match=None):
+        self.path = path
+        self.status = status
+        self.confidence = confidence
+        self.match = match
+
+
+def json_default(obj):
+    """json.dumps(default=...) hook: records serialise as their dicts"""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
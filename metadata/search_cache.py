@@ -0,0 +1,130 @@
+# metadata/search_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from utils.helpers import debug_log
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.mp3_metadata_cleaner', 'search_cache.sqlite3')
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so equivalent queries share a key"""
+    return ' '.join(str(query).lower().split())
+
+
+class SearchCache:
+    """
+    SQLite-backed cache of catalog search responses.
+
+    Keyed on (kind, normalized query, limit), where kind separates song
+    searches from album searches and collection lookups. Entries expire
+    after `ttl` seconds (`negative_ttl` for empty results) and the least
+    recently used rows are evicted once more than `max_entries` are stored.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=7 * 24 * 3600,
+                 negative_ttl=24 * 3600, max_entries=50000):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " results TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(query, limit, kind='song'):
+        key = f"{limit}|{normalize_query(query)}"
+        return key if kind == 'song' else f"{kind}:{key}"
+
+    def get(self, query, limit, kind='song'):
+        """Return the cached result list, or None on a miss / expired entry"""
+        key = self.make_key(query, limit, kind)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            results = json.loads(row[0])
+            ttl = self.ttl if results else self.negative_ttl
+            if now - row[1] > ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._count -= 1
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        debug_log('Search cache hit', key)
+        return results
+
+    def put(self, query, limit, results, kind='song'):
+        key = self.make_key(query, limit, kind)
+        now = time.time()
+        payload = json.dumps(results)
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, results, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            if not exists:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict(self._count - self.max_entries)
+            self._conn.commit()
+
+    def _evict(self, n):
+        """Drop the `n` least recently used entries (caller holds the lock)"""
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN"
+            " (SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)", (n,)
+        )
+        self._count -= n
+        debug_log(f'Search cache evicted {n} entries')
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._count = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': self._count,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
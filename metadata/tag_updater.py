@@ -1,46 +1,105 @@
 # metadata/tag_updater.py
+import os
 from mutagen.mp3 import MP3
-from mutagen.id3 import ID3, TIT2, TPE1, TALB, TYER, TCON, TRCK, APIC
-import requests
+from mutagen.id3 import ID3, TIT2, TPE1, TALB, TDRC, TCON, TRCK, APIC
 from utils.helpers import debug_log
+from metadata.artwork_cache import get_artwork_cache
+from utils.metrics import METRICS
 
-def update_mp3_metadata(file_path, apple_meta):
+# When a tag outgrows its padding, leave this much room so later edits stay in place
+MIN_PADDING = 16 * 1024
+
+TEXT_FRAMES = (
+    ('TIT2', TIT2, 'title'),
+    ('TPE1', TPE1, 'artist'),
+    ('TALB', TALB, 'album'),
+    ('TDRC', TDRC, 'year'),  # v2.4 year; mutagen upgrades TYER to it on load anyway
+    ('TCON', TCON, 'genre'),
+    ('TRCK', TRCK, 'track'),
+)
+
+def _padding(info):
+    """Keep whatever padding fits (never shrink and rewrite); grow generously otherwise"""
+    if info.padding >= 0:
+        return info.padding
+    return max(MIN_PADDING, 1024 + info.size // 100)
+
+def _front_covers(tags):
+    return [tags[k] for k in tags.keys() if k.startswith('APIC')]
+
+def apply_mp3_metadata(file_path, apple_meta):
+    """
+    Write only the frames that differ from `apple_meta`.
+
+    Returns a report dict: ok, changed (frame ids), bytes_written and
+    rewrote_file (True when the tag no longer fitted and the whole file was
+    rewritten). Nothing is saved when nothing changed.
+    """
+    report = {'ok': False, 'changed': [], 'bytes_written': 0, 'rewrote_file': False}
     try:
         audio = MP3(file_path, ID3=ID3)
         if audio.tags is None:
             audio.add_tags()
         tags = audio.tags
+        old_tag_size = getattr(tags, 'size', 0) or 0
 
         # Text fields
-        tags["TIT2"] = TIT2(encoding=3, text=apple_meta['title'])
-        tags["TPE1"] = TPE1(encoding=3, text=apple_meta['artist'])
-        tags["TALB"] = TALB(encoding=3, text=apple_meta['album'])
-        tags["TYER"] = TYER(encoding=3, text=str(apple_meta['year']))
-        tags["TCON"] = TCON(encoding=3, text=apple_meta['genre'])
-        tags["TRCK"] = TRCK(encoding=3, text=str(apple_meta['track']))
-
-        # Artwork
-        # Artwork – REMOVE ALL APIC frames first
+        for frame_id, frame_cls, key in TEXT_FRAMES:
+            value = str(apple_meta[key])
+            if frame_id == 'TDRC' and not value.isdigit():
+                continue  # 'Unknown' is not a valid timestamp; keep what the file has
+            current = tags.get(frame_id)
+            if current is not None and [str(t) for t in current.text] == [value]:
+                continue
+            tags[frame_id] = frame_cls(encoding=3, text=value)
+            report['changed'].append(frame_id)
+
+        # Artwork, normalized once per album (metadata.artwork) – a single
+        # front cover with exactly these bytes is left alone
         if apple_meta.get('album_art_url'):
-            art_data = requests.get(apple_meta['album_art_url'], timeout=10).content
-            
-            # ← FIX: Remove ALL APIC frames (there can be multiple!) # Remove ALL existing cover art
-            for key in list(tags.keys()):
-                if key.startswith('APIC'):
-                    del tags[key]
-
-            # Add new front cover
-            tags['APIC'] = APIC(
-                encoding=3,
-                mime='image/jpeg',
-                type=3,  # 3 = front cover
-                desc='Cover',
-                data=art_data
-            )
-
-        audio.save()
+            art_data = get_artwork_cache().get_normalized(apple_meta['album_art_url'], timeout=10)
+            covers = _front_covers(tags)
+            if not (len(covers) == 1 and covers[0].type == 3 and covers[0].data == art_data):
+                # Remove ALL existing cover art (there can be multiple!)
+                for key in list(tags.keys()):
+                    if key.startswith('APIC'):
+                        del tags[key]
+
+                # Add new front cover
+                tags['APIC'] = APIC(
+                    encoding=3,
+                    mime='image/jpeg',
+                    type=3,  # 3 = front cover
+                    desc='Cover',
+                    data=art_data
+                )
+                report['changed'].append('APIC')
+
+        if not report['changed']:
+            debug_log('Metadata already up to date', file_path)
+            report['ok'] = True
+            return report
+
+        def padding(info):
+            report['rewrote_file'] = info.padding < 0
+            return _padding(info)
+
+        with METRICS.timer('tag_save'):
+            audio.save(padding=padding)
+        if report['rewrote_file'] or not old_tag_size:
+            report['bytes_written'] = os.path.getsize(file_path)
+        else:
+            report['bytes_written'] = old_tag_size
+        report['ok'] = True
+        METRICS.inc('tag_bytes_written', report['bytes_written'])
+        if report['rewrote_file']:
+            METRICS.inc('tag_full_rewrites')
         debug_log('Metadata updated', file_path)
-        return True
+        return report
     except Exception as e:
         debug_log(f'Update failed: {e}')
-        return False
\ No newline at end of file
+        report['error'] = str(e)
+        return report
+
+def update_mp3_metadata(file_path, apple_meta):
+    return apply_mp3_metadata(file_path, apple_meta)['ok']
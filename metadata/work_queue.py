@@ -0,0 +1,291 @@
+# metadata/work_queue.py
+"""
+Shared batch work queue: several hosts tag one library without overlap.
+
+    python -m metadata.work_queue QUEUE_DB [--add ROOT ...] [--root DIR]
+
+prints the queue's progress (and seeds it with the .mp3 files under each
+--add ROOT first). Workers are `python cli.py --queue QUEUE_DB` on each
+host; see WorkQueue.
+"""
+import argparse
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+from utils.helpers import debug_log
+
+# Outcomes that are retried (up to max_attempts) instead of settling the file
+RETRY_STATUSES = ('error', 'failed')
+ADD_BATCH = 5000
+
+
+class WorkQueue:
+    """
+    Files to process, leased out to workers in small batches.
+
+    claim() hands a worker up to `claim_size` files it then holds for
+    `lease_s` seconds; a heartbeat thread keeps renewing the leases of
+    files still in flight while the worker makes progress, so only files
+    of a dead (or hung) worker expire and are claimed again by the others.
+    complete() is idempotent: the first outcome recorded for a file wins
+    and later ones are ignored. 'error' and 'failed' outcomes go back to
+    the queue until a file has been attempted `max_attempts` times, and
+    are ignored once the file's lease has passed to another worker.
+
+    The queue is one SQLite file, e.g. next to the library on the NAS. It
+    uses rollback-journal mode (WAL needs shared memory and does not work
+    across hosts), so the share must support file locking (NFSv4 or SMB).
+    With `root`, paths are stored relative to it, so each host may mount
+    the library somewhere else.
+    """
+
+    def __init__(self, path, root=None, worker_id=None, lease_s=300, claim_size=32,
+                 max_attempts=3, poll_s=5.0, commit_every=100):
+        self.path = path
+        self.root = os.path.abspath(root) if root else None
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_s = lease_s
+        self.claim_size = claim_size
+        self.max_attempts = max_attempts
+        self.poll_s = poll_s
+        self.commit_every = commit_every
+        self.claimed = 0
+        self.completed = 0
+        self.duplicates = 0  # completions another worker had already recorded
+        self._pending_done = []
+        self._last_progress = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._heartbeat = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit mode: transactions are explicit BEGIN IMMEDIATE ... COMMIT
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS work ("
+            " path TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL DEFAULT 'pending',"  # pending, leased, done
+            " owner TEXT,"
+            " lease_until REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " status TEXT,"
+            " confidence INTEGER,"
+            " finished REAL);"
+            "CREATE INDEX IF NOT EXISTS work_state ON work (state, lease_until);"
+        )
+
+    # ---- Paths ----
+    def _key(self, path):
+        if self.root is None:
+            return path
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, '/')
+
+    def _path(self, key):
+        if self.root is None:
+            return key
+        return os.path.join(self.root, *key.split('/'))
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return out
+
+    # ---- Producer ----
+    def add(self, paths):
+        """Queue `paths` (any iterable); files already queued are left as they are. Returns the count added"""
+        added, batch = 0, []
+
+        def insert(conn):
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO work (path) VALUES (?)", batch)
+            return conn.total_changes - before
+
+        for path in paths:
+            batch.append((self._key(path),))
+            if len(batch) >= ADD_BATCH:
+                added += self._transaction(insert)
+                batch = []
+        if batch:
+            added += self._transaction(insert)
+        debug_log(f'Work queue: added {added} files')
+        return added
+
+    # ---- Worker ----
+    def claim(self, n=None):
+        """Lease up to `n` files (expired leases first); returns their paths"""
+        n = n or self.claim_size
+        self.flush()
+
+        def take(conn):
+            now = time.time()
+            keys = [r[0] for r in conn.execute(
+                "SELECT path FROM work WHERE state = 'leased' AND lease_until < ? LIMIT ?", (now, n))]
+            if len(keys) < n:
+                keys += [r[0] for r in conn.execute(
+                    "SELECT path FROM work WHERE state = 'pending' ORDER BY rowid LIMIT ?", (n - len(keys),))]
+            conn.executemany(
+                "UPDATE work SET state = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1"
+                " WHERE path = ?",
+                [(self.worker_id, now + self.lease_s, k) for k in keys]
+            )
+            return keys
+
+        keys = self._transaction(take)
+        self.claimed += len(keys)
+        self._last_progress = time.monotonic()
+        if keys:
+            self._start_heartbeat()
+        return [self._path(k) for k in keys]
+
+    def claims(self, wait=True):
+        """
+        Claim and yield paths until the queue is drained or close() is
+        called. With wait=True, a worker that finds nothing to claim keeps
+        polling while other workers still hold leases, so it can take over
+        their files if they die.
+        """
+        while not self._closed.is_set():
+            batch = self.claim()
+            if batch:
+                yield from batch
+                continue
+            if not wait or not self._others_busy():
+                return
+            self._closed.wait(self.poll_s)
+
+    def _others_busy(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM work WHERE state = 'leased' AND owner != ?", (self.worker_id,)
+            ).fetchone()
+        return row[0] > 0
+
+    def complete(self, path, status, confidence=None):
+        """Record a file's outcome (buffered; see flush)"""
+        with self._lock:
+            self._pending_done.append((self._key(path), status, confidence))
+            self._last_progress = time.monotonic()
+            full = len(self._pending_done) >= self.commit_every
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            done, self._pending_done = self._pending_done, []
+        if not done:
+            return
+
+        def record(conn):
+            now, recorded, retried = time.time(), 0, 0
+            for key, status, confidence in done:
+                if status in RETRY_STATUSES:
+                    # Back to the queue unless it has had its chances; either
+                    # way only while this worker still holds the lease
+                    cur = conn.execute(
+                        "UPDATE work SET state = 'pending', owner = NULL, lease_until = NULL, status = ?"
+                        " WHERE path = ? AND state = 'leased' AND owner = ? AND attempts < ?",
+                        (status, key, self.worker_id, self.max_attempts))
+                    if cur.rowcount:
+                        retried += 1
+                        continue
+                    cur = conn.execute(
+                        "UPDATE work SET state = 'done', status = ?, confidence = ?, finished = ?"
+                        " WHERE path = ? AND state = 'leased' AND owner = ?",
+                        (status, confidence, now, key, self.worker_id))
+                else:
+                    cur = conn.execute(
+                        "UPDATE work SET state = 'done', status = ?, confidence = ?, owner = ?, finished = ?"
+                        " WHERE path = ? AND state != 'done'",
+                        (status, confidence, self.worker_id, now, key))
+                recorded += cur.rowcount
+            return recorded, retried
+
+        recorded, retried = self._transaction(record)
+        self.completed += recorded
+        self.duplicates += len(done) - recorded - retried
+
+    def renew(self):
+        """Extend every lease this worker holds; returns the count"""
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE work SET lease_until = ? WHERE state = 'leased' AND owner = ?",
+            (time.time() + self.lease_s, self.worker_id)).rowcount)
+
+    def _start_heartbeat(self):
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._beat, daemon=True)
+            self._heartbeat.start()
+
+    def _beat(self):
+        while not self._closed.wait(self.lease_s / 3):
+            try:
+                self.flush()
+                # A worker that finished nothing for a whole lease is hung: let its leases lapse
+                if time.monotonic() - self._last_progress < self.lease_s:
+                    self.renew()
+            except sqlite3.Error as e:
+                debug_log(f'Work queue heartbeat error: {e}')
+
+    def release(self):
+        """Hand this worker's unfinished files back to the queue; returns the count"""
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE work SET state = 'pending', owner = NULL, lease_until = NULL,"
+            " attempts = MAX(attempts - 1, 0) WHERE state = 'leased' AND owner = ?",
+            (self.worker_id,)).rowcount)
+
+    # ---- Reporting ----
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT CASE WHEN state = 'leased' AND lease_until < ? THEN 'expired' ELSE state END,"
+                " COUNT(*) FROM work GROUP BY 1", (time.time(),)
+            ).fetchall()
+            workers = self._conn.execute(
+                "SELECT COUNT(DISTINCT owner) FROM work WHERE state = 'leased' AND lease_until >= ?",
+                (time.time(),)
+            ).fetchone()[0]
+        stats = {'pending': 0, 'leased': 0, 'expired': 0, 'done': 0}
+        stats.update(rows)
+        stats['workers'] = workers
+        return stats
+
+    def close(self):
+        """Record buffered outcomes, return unfinished leases and stop the heartbeat"""
+        self._closed.set()
+        try:
+            self.flush()
+            released = self.release()
+            if released:
+                debug_log(f'Work queue: released {released} unfinished files')
+        finally:
+            with self._lock:
+                self._conn.close()
+
+
+def main(argv=None):
+    from utils.discovery import Discovery
+
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument('db', help="queue database")
+    p.add_argument('--add', nargs='+', default=[], metavar='ROOT', help="queue the .mp3 files under these roots")
+    p.add_argument('--root', help="library root the queued paths are relative to")
+    args = p.parse_args(argv)
+    queue = WorkQueue(args.db, root=args.root)
+    if args.add:
+        print(f"added {queue.add(Discovery(args.add))} files", file=sys.stderr)
+    print(queue.stats())
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# metadata/write_scheduler.py
+import bisect
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.metrics import METRICS
+
+
+def mount_point(path):
+    """The directory `path`'s file system is mounted on"""
+    path = os.path.abspath(path)
+    dev = os.stat(path).st_dev
+    while True:
+        parent = os.path.dirname(path)
+        if parent == path:
+            return path
+        try:
+            if os.stat(parent).st_dev != dev:
+                return path
+        except OSError:
+            return path
+        path = parent
+
+
+class _Device:
+    def __init__(self, label):
+        self.label = label
+        self.pending = []  # sorted (locality key, seq, item)
+        self.last = None  # locality key of the last write handed out
+        self.active = 0
+        self.writes = 0
+        self.bytes = 0
+        self.busy_s = 0.0
+        self.first_start = None
+        self.last_end = None
+
+
+class WriteScheduler:
+    """
+    Inbox for the write stage that orders and throttles tag saves per device.
+
+    Pending writes are grouped by the device (st_dev, i.e. disk or mount)
+    their file lives on and kept sorted by (directory, inode). get() serves
+    devices round-robin by fewest writes in progress, and within a device
+    continues from where its last write was, sweeping forward like an
+    elevator, so one album's files are written back to back instead of in
+    the order their searches happened to finish. slot() caps concurrent
+    saves per device at `per_device`; spinning disks and network mounts
+    lose far more to seeks and contention than they gain from parallelism.
+
+    Drop-in for the Stage inbox (put/get/qsize): `sentinel` items are only
+    handed out once no writes are pending, and put() blocks past `maxsize`.
+    """
+
+    def __init__(self, sentinel, maxsize=32, per_device=1):
+        self.sentinel = sentinel
+        self.maxsize = maxsize
+        self.per_device = max(1, per_device)
+        self._devices = {}  # st_dev -> _Device
+        self._sentinels = 0
+        self._count = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    # ---- Stage inbox interface ----
+    def put(self, item):
+        if item is self.sentinel:
+            with self._cond:
+                self._sentinels += 1
+                self._cond.notify_all()
+            return
+        dev, key = self._locate(item['result']['path'])
+        with self._cond:
+            while self._count >= self.maxsize:
+                self._cond.wait()
+            device = self._devices.get(dev)
+            if device is None:
+                device = self._devices[dev] = _Device(self._label(item['result']['path']))
+            bisect.insort(device.pending, (key, next(self._seq), item))
+            item['write_device'] = dev
+            self._count += 1
+            self._cond.notify_all()
+
+    def get(self):
+        with self._cond:
+            while True:
+                busy = [d for d in self._devices.values() if d.pending]
+                if busy:
+                    device = min(busy, key=lambda d: (d.active >= self.per_device, d.active, -len(d.pending)))
+                    i = bisect.bisect_left(device.pending, (device.last,)) if device.last is not None else 0
+                    if i == len(device.pending):
+                        i = 0  # end of the sweep: start over from the lowest position
+                    key, _, item = device.pending.pop(i)
+                    device.last = key
+                    self._count -= 1
+                    self._cond.notify_all()
+                    return item
+                if self._sentinels:
+                    self._sentinels -= 1
+                    return self.sentinel
+                self._cond.wait()
+
+    def qsize(self):
+        with self._cond:
+            return self._count
+
+    @staticmethod
+    def _locate(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, (os.path.dirname(path), 0)
+        return st.st_dev, (os.path.dirname(path), st.st_ino)
+
+    @staticmethod
+    def _label(path):
+        try:
+            return mount_point(path)
+        except OSError:
+            return '?'
+
+    # ---- Throttling ----
+    @contextmanager
+    def slot(self, item):
+        """Hold one of the item's device write slots for the duration of the save"""
+        device = self._devices[item.pop('write_device')]
+        waited = time.perf_counter()
+        with self._cond:
+            while device.active >= self.per_device:
+                self._cond.wait()
+            device.active += 1
+        METRICS.observe('write_slot_wait', time.perf_counter() - waited)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            with self._cond:
+                device.active -= 1
+                device.writes += 1
+                device.bytes += item['result'].get('bytes_written') or 0
+                device.busy_s += end - start
+                if device.first_start is None:
+                    device.first_start = start
+                device.last_end = end
+                self._cond.notify_all()
+
+    # ---- Reporting ----
+    def stats(self):
+        """Per device (by mount point): writes, MB written and MB/s over its active span"""
+        with self._cond:
+            out = {}
+            for d in self._devices.values():
+                span = (d.last_end - d.first_start) if d.writes else 0.0
+                out[d.label] = {
+                    'writes': d.writes,
+                    'pending': len(d.pending),
+                    'mb': round(d.bytes / 1e6, 2),
+                    'mb_per_s': round(d.bytes / 1e6 / span, 2) if span else 0.0,
+                    'busy_s': round(d.busy_s, 2),
+                }
+            return out
+
+    def format_stats(self):
+        return ", ".join(
+            f"{label} {st['writes']} writes {st['mb']} MB ({st['mb_per_s']} MB/s)"
+            for label, st in self.stats().items()
+        )
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from mutagen.id3 import ID3, TALB, TCON, TDRC, TIT2, TPE1, TRCK, TYER
+
+from metadata.mp3_reader import read_mp3_metadata
+
+# MPEG-1 Layer III, 32 kbps, 44.1 kHz: one second of silent frames
+SILENCE = (b'\xff\xfb\x10\x00' + b'\x00' * 100) * 39
+FIELDS = ('title', 'artist', 'album', 'year', 'genre', 'track', 'duration_ms')
+
+
+def id3v1(title=b'', artist=b'', album=b'', year=b'', track=0, genre=255):
+    """A 128-byte ID3v1.1 tag"""
+    return (b'TAG' + title.ljust(30, b'\x00') + artist.ljust(30, b'\x00') + album.ljust(30, b'\x00')
+            + year.ljust(4, b'\x00') + b'\x00' * 29 + bytes([track, genre]))
+
+
+class FastReadParityTest(unittest.TestCase):
+    """read_mp3_metadata(fast=True) must agree with the full mutagen read"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, frames=(), v2_version=4, v1=None):
+        path = os.path.join(self.tmp.name, f'{self.id()}.mp3')
+        with open(path, 'wb') as f:
+            f.write(SILENCE)
+        if frames:
+            tags = ID3()
+            for frame in frames:
+                tags.add(frame)
+            tags.save(path, v1=0, v2_version=v2_version)
+        if v1:
+            with open(path, 'ab') as f:
+                f.write(v1)
+        return path
+
+    def assertParity(self, path, **expected):
+        full = read_mp3_metadata(path)
+        fast = read_mp3_metadata(path, fast=True)
+        self.assertEqual({k: fast[k] for k in FIELDS}, {k: full[k] for k in FIELDS})
+        for key, value in expected.items():
+            self.assertEqual(fast[key], value)
+
+    def test_v1_only(self):
+        path = self.write(v1=id3v1(b'Hello', b'World', b'Alb', b'1999', track=3, genre=17))
+        self.assertParity(path, title='Hello', artist='World', album='Alb', year='1999',
+                          genre='Rock', track='3')
+
+    def test_v23(self):
+        path = self.write([TIT2(encoding=1, text='Title'), TPE1(encoding=1, text='Artist'),
+                           TALB(encoding=1, text='Album'), TYER(encoding=1, text='2001'),
+                           TCON(encoding=1, text='(17)'), TRCK(encoding=1, text='4/12')], v2_version=3)
+        self.assertParity(path, year='2001', genre='Rock', track='4/12')
+
+    def test_v24(self):
+        path = self.write([TIT2(encoding=3, text='Títle'), TPE1(encoding=3, text='Ärtist'),
+                           TDRC(encoding=3, text='2004-05-06'), TCON(encoding=3, text='Jazz')])
+        self.assertParity(path, title='Títle', year='2004', genre='Jazz')
+
+    def test_v1_fills_what_v2_lacks(self):
+        path = self.write([TIT2(encoding=3, text='From v2')], v2_version=4,
+                          v1=id3v1(b'From v1', b'V1 Artist', b'V1 Album', b'1987', track=9, genre=0))
+        self.assertParity(path, title='From v2', artist='V1 Artist', album='V1 Album', year='1987',
+                          genre='Blues', track='9')
+
+    def test_tyer_and_tdrc(self):
+        path = self.write([TIT2(encoding=1, text='Both'), TYER(encoding=1, text='1990'),
+                           TDRC(encoding=1, text='1995')], v2_version=3)
+        self.assertParity(path)
+
+    def test_untagged(self):
+        self.assertParity(self.write(), title='Unknown', year='Unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
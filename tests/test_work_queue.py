@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+import unittest
+
+from metadata.work_queue import WorkQueue
+
+LEASE_S = 0.2
+
+
+class WorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        db = os.path.join(self.tmp.name, 'queue.sqlite')
+        self.a = WorkQueue(db, worker_id='a', lease_s=LEASE_S, claim_size=2, commit_every=1)
+        self.b = WorkQueue(db, worker_id='b', lease_s=LEASE_S, claim_size=2, commit_every=1)
+        self.a.add(['/music/1.mp3', '/music/2.mp3', '/music/3.mp3'])
+
+    def tearDown(self):
+        self.a.close()
+        self.b.close()
+        self.tmp.cleanup()
+
+    def kill(self, worker):
+        """Stop a worker's heartbeat, as if its host died"""
+        worker._closed.set()
+
+    def expire(self):
+        time.sleep(LEASE_S * 1.5)
+
+    def test_claims_do_not_overlap(self):
+        first = self.a.claim()
+        second = self.b.claim()
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(self.a.claim(), [])
+
+    def test_expired_lease_is_reclaimed(self):
+        claimed = self.a.claim()
+        self.kill(self.a)
+        self.b.claim(3)  # the unclaimed file
+        self.assertEqual(self.b.claim(), [])  # a's leases are still live
+        self.expire()
+        self.assertEqual(sorted(self.b.claim()), sorted(claimed))
+
+    def test_duplicate_completion_is_ignored(self):
+        path = self.a.claim(1)[0]
+        self.kill(self.a)
+        self.expire()
+        self.assertEqual(self.b.claim(1), [path])
+        self.b.complete(path, 'updated', 95)
+        self.a.complete(path, 'no_match')  # the stalled worker finishes late
+        self.assertEqual((self.b.completed, self.b.duplicates), (1, 0))
+        self.assertEqual((self.a.completed, self.a.duplicates), (0, 1))
+        row = self.b._conn.execute("SELECT status, owner FROM work WHERE path = ?", (path,)).fetchone()
+        self.assertEqual(row, ('updated', 'b'))
+
+    def test_stale_error_does_not_requeue(self):
+        path = self.a.claim(1)[0]
+        self.kill(self.a)
+        self.expire()
+        self.b.claim(1)
+        self.a.complete(path, 'error')
+        row = self.b._conn.execute("SELECT state, owner FROM work WHERE path = ?", (path,)).fetchone()
+        self.assertEqual(row, ('leased', 'b'))
+        self.assertEqual(self.a.duplicates, 1)
+
+    def test_error_is_retried_until_max_attempts(self):
+        queue = WorkQueue(os.path.join(self.tmp.name, 'retry.sqlite'), worker_id='c',
+                          max_attempts=2, commit_every=1)
+        self.addCleanup(queue.close)
+        queue.add(['/music/x.mp3'])
+        for _ in range(2):
+            self.assertEqual(queue.claim(), ['/music/x.mp3'])
+            queue.complete('/music/x.mp3', 'error')
+        self.assertEqual(queue.claim(), [])
+        self.assertEqual(queue.stats()['done'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
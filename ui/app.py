@@ -2,33 +2,77 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import threading
-import concurrent.futures
 import os
+import queue
+import time
 import requests
 from PIL import Image, ImageTk
 from io import BytesIO
 
-from metadata.mp3_reader import read_mp3_metadata
-from metadata.apple_music import search_apple_music
+from metadata.mp3_reader import read_mp3_metadata, get_cover_art
+from metadata.search_cache import SearchCache
+from metadata.catalog import get_catalog, ITunesCatalog
+from metadata.library_index import LibraryIndex
 from metadata.tag_updater import update_mp3_metadata
+from metadata.batch import format_status
+from metadata.pipeline import BatchPipeline
+from metadata.album_matcher import AlbumMatcher
+from metadata.journal import BatchJournal, journal_path_for
+from metadata.records import BatchResult
+from utils.discovery import Discovery
 from utils.helpers import debug_log
-from ui.components import create_metadata_panel, add_metadata_fields, add_confidence_badge
+from utils.metrics import METRICS
+from ui.components import create_metadata_panel, add_metadata_fields, add_confidence_badge, VirtualList
+from ui.prefetch import Prefetcher, PREFETCH_WINDOW
+from ui.thumbnails import get_thumbnail_cache
+
+# Batch progress is applied to the widgets in one go every tick
+UI_TICK_MS = 100
+MAX_UPDATES_PER_TICK = 5000
+# Candidate artwork thumbnails prepared per prefetched file
+PREFETCH_THUMBNAILS = 3
 
 
 class MP3MetadataApp:
-    def __init__(self, root):
+    def __init__(self, root, prefetch_window=PREFETCH_WINDOW):
         self.root = root
         self.root.title("MP3 Apple Music Metadata Tool")
         self.root.geometry("1200x800")
         self.root.configure(bg="#f0f0f0")
 
         self.file_list = []
+        self.selected_root = None  # folder (or single file) file_list came from
         self.current_idx = 0
         self.is_folder_mode = False
         self.mp3_meta = None
         self.apple_results = []
         self.selected_apple = None
         self.content = None  # Will be set in setup_ui
+        self.scan = None  # Discovery feeding file_list in folder mode
+        self.scan_done = None
+        self._scan_cond = threading.Condition()
+        self._waiting_for_file = False
+        self.ui_queue = queue.Queue()  # batch worker → Tk, drained by _drain_ui_queue
+        self._batch = None  # pipeline, start time and total of the running batch
+        # Folder mode: files after the current one are read, searched and scored ahead of time
+        self.prefetcher = Prefetcher(self._prefetch, window=prefetch_window)
+
+        # Shared by the interactive and batch paths; search still works without it
+        try:
+            self.search_cache = SearchCache()
+        except Exception as e:
+            debug_log(f"Search cache disabled: {e}")
+            self.search_cache = None
+        try:
+            self.catalog = get_catalog(self.search_cache)
+        except Exception as e:
+            debug_log(f"Local catalog unavailable, using iTunes: {e}")
+            self.catalog = ITunesCatalog(self.search_cache)
+        try:
+            self.library_index = LibraryIndex()
+        except Exception as e:
+            debug_log(f"Library index disabled: {e}")
+            self.library_index = None
 
         self.setup_ui()
 
@@ -55,6 +99,8 @@ class MP3MetadataApp:
 
         self.status = tk.Label(self.content, text="", bg="white", anchor="w", font=("Arial", 10))
         self.status.pack(fill="x", pady=5)
+        self.scan_label = tk.Label(self.content, text="", bg="white", fg="#666", anchor="w", font=("Arial", 9))
+        self.scan_label.pack(fill="x")
 
         # --- Search Results ---
         self.results_frame = tk.Frame(self.content, bg="white")
@@ -94,13 +140,14 @@ class MP3MetadataApp:
 
         # --- Batch Results ---
         self.batch_frame = tk.Frame(self.content, bg="white")
-        self.batch_tree = ttk.Treeview(self.batch_frame,
-                                      columns=('File', 'Status'), show='headings', height=12)
-        self.batch_tree.heading('File', text='File')
-        self.batch_tree.heading('Status', text='Status')
-        self.batch_tree.column('File', width=400)
-        self.batch_tree.column('Status', width=150)
-        self.batch_tree.pack(fill="both", expand=True)
+        progress_row = tk.Frame(self.batch_frame, bg="white")
+        progress_row.pack(fill="x", pady=(0, 5))
+        self.batch_progress = ttk.Progressbar(progress_row, mode='determinate')
+        self.batch_progress.pack(side="left", fill="x", expand=True)
+        self.batch_rate = tk.Label(progress_row, text="", bg="white", font=("Arial", 9), width=40, anchor="e")
+        self.batch_rate.pack(side="right", padx=5)
+        self.batch_list = VirtualList(self.batch_frame, ('File', 'Status'), (400, 250))
+        self.batch_list.pack(fill="both", expand=True)
         self.batch_frame.pack(fill="both", expand=True, pady=10)
         self.batch_frame.pack_forget()
 
@@ -108,7 +155,10 @@ class MP3MetadataApp:
     def select_single(self):
         path = filedialog.askopenfilename(filetypes=[("MP3 files", "*.mp3")])
         if path:
+            self.stop_scan()
+            self.prefetcher.cancel()
             self.file_list = [path]
+            self.selected_root = path
             self.is_folder_mode = False
             self.current_idx = 0
             self.process_file()
@@ -116,20 +166,98 @@ class MP3MetadataApp:
     def select_folder(self):
         folder = filedialog.askdirectory()
         if folder:
-            self.file_list = [
-                os.path.join(r, f)
-                for r, _, fs in os.walk(folder)
-                for f in fs if f.lower().endswith('.mp3')
-            ]
-            self.is_folder_mode = True
-            self.current_idx = 0
-            if self.file_list:
-                self.process_file()
-            else:
+            self.start_scan(folder)
+
+    def start_scan(self, folder):
+        """Discover MP3s in the background; folder mode starts with the first one found"""
+        self.stop_scan()
+        self.prefetcher.cancel()
+        self.file_list = []
+        self.selected_root = folder
+        self.is_folder_mode = True
+        self.current_idx = 0
+        self._waiting_for_file = True
+        self.status.config(text="Scanning folder…")
+        self.scan = Discovery(folder)
+        self.scan_done = threading.Event()
+        threading.Thread(target=self._run_scan, args=(self.scan, self.scan_done, folder, self.file_list),
+                         daemon=True).start()
+
+    def stop_scan(self):
+        if self.scan is not None:
+            self.scan.cancel()
+        self.scan = None
+        self.scan_label.config(text="")
+
+    def scanning(self):
+        return self.scan_done is not None and not self.scan_done.is_set()
+
+    def _run_scan(self, discovery, done, folder, files):
+        skipped = 0
+        last_report = 0
+        try:
+            for path in discovery:
+                # Unmatched files stay listed so they can be fixed by hand
+                if (self.library_index is not None
+                        and not self.library_index.needs_processing(path, include_unmatched=False)):
+                    skipped += 1
+                else:
+                    with self._scan_cond:
+                        files.append(path)
+                        self._scan_cond.notify_all()
+                if len(files) == 1 or time.monotonic() - last_report >= 0.25:
+                    self.root.after(0, self._scan_progress, discovery, folder, files, skipped, False)
+                    last_report = time.monotonic()
+        except Exception as e:
+            debug_log(f"Folder scan error: {e}")
+        finally:
+            with self._scan_cond:
+                done.set()
+                self._scan_cond.notify_all()
+            self.root.after(0, self._scan_progress, discovery, folder, files, skipped, True)
+
+    def _scan_progress(self, discovery, folder, files, skipped, finished):
+        if discovery is not self.scan:
+            return  # superseded by another folder
+        text = f"{discovery.found} MP3 file(s) found" + (f", {skipped} unchanged skipped" if skipped else "")
+        self.scan_label.config(text=text if finished else f"Scanning… {text}")
+        if not self._waiting_for_file:
+            return
+        if self.current_idx < len(files):
+            self._waiting_for_file = False
+            self.process_file()
+        elif finished:
+            self._waiting_for_file = False
+            if not discovery.found:
                 messagebox.showerror("Error", "No MP3 files found in the folder.")
+            elif not files and messagebox.askyesno(
+                    "Already matched", "All files in this folder are already matched. Re-match them anyway?"):
+                self.library_index.invalidate(folder)
+                self.start_scan(folder)
+            elif not files:
+                self.status.config(text="All files already matched.")
+            else:
+                self.process_file()
+
+    def _follow_scan(self, done, files):
+        """Yield file_list entries as the scan appends them, until it finishes"""
+        i = 0
+        while True:
+            with self._scan_cond:
+                while i >= len(files) and not done.is_set():
+                    self._scan_cond.wait()
+                if i >= len(files):
+                    return
+                batch = files[i:]
+            i += len(batch)
+            yield from batch
 
     def process_file(self):
         if self.current_idx >= len(self.file_list):
+            if self.is_folder_mode and self.scanning():
+                self._waiting_for_file = True
+                self.status.config(text="Waiting for the folder scan…")
+                return
             self.status.config(text="All files processed.") # Message for FOLDER scenario
             self.action_frame.pack_forget()
             # No button — just status
@@ -137,16 +265,49 @@ class MP3MetadataApp:
 
         self.status.config(text="Loading MP3...")
         threading.Thread(target=self.load_mp3, daemon=True).start()
+        if self.is_folder_mode:
+            nxt = self.current_idx + 1
+            self.prefetcher.schedule(self.file_list[nxt:nxt + self.prefetcher.window])
+
+    def _prefetch(self, path, cancelled):
+        """Prefetch worker: read, search and score a file and prepare its thumbnails"""
+        mp3 = read_mp3_metadata(path, fast=True)
+        if cancelled():
+            return None
+        results = self._search(mp3)
+        thumbs = get_thumbnail_cache()
+        try:
+            art = get_cover_art(mp3)
+            if art:
+                thumbs.from_bytes(art)
+            for r in results[:PREFETCH_THUMBNAILS]:
+                if cancelled():
+                    break
+                if r.get('album_art_url'):
+                    thumbs.from_url(r['album_art_url'])
+        except Exception as e:
+            debug_log(f"Prefetch artwork failed for {path}: {e}")
+        return {'mp3': mp3, 'results': results}
 
     def load_mp3(self):
         path = self.file_list[self.current_idx]
+        prefetched = None
+        future = self.prefetcher.take(path)
+        if future is not None:
+            try:
+                prefetched = future.result()  # waits if it is still in flight
+            except Exception:
+                prefetched = None  # cancelled or failed: load it normally
         try:
-            self.mp3_meta = read_mp3_metadata(path)
-            self.root.after(0, self.show_mp3_and_search)  # NEW combined
+            if prefetched:
+                self.mp3_meta, results = prefetched['mp3'], prefetched['results']
+            else:
+                self.mp3_meta, results = read_mp3_metadata(path, fast=True), None
+            self.root.after(0, lambda: self.show_mp3_and_search(results))  # NEW combined
         except Exception as e:
             self.root.after(0, lambda: self.status.config(text=f"Error: {e}"))
 
-    def show_mp3_and_search(self):  # NEW
+    def show_mp3_and_search(self, results=None):  # NEW
         # ---- 1. RE-PACK the comparison area (was hidden in update()) ----
         self.compare_frame.pack(fill="both", expand=True, pady=10)
 
@@ -164,15 +325,22 @@ class MP3MetadataApp:
         tk.Label(left, text="Searching...", fg="gray", font=("Arial", 10, "italic")).pack(pady=20)
         left.pack(side="left", fill="both", expand=True, padx=5)
 
-        # ---- 5. Start search in background ----
+        # ---- 5. Use prefetched results, or start search in background ----
+        if results is not None:
+            self.display_results(results)
+            self.status.config(text="")
+            return
         self.status.config(text="Searching Apple Music...")
         threading.Thread(target=self._do_search, daemon=True).start()
 
-    def _do_search(self):  # NEW
-        results = search_apple_music(
-            self.mp3_meta['title'], self.mp3_meta['artist'], self.mp3_meta['duration_ms'],
-            self.mp3_meta  # PASS FULL!
+    def _search(self, mp3):
+        return self.catalog.search(
+            mp3['title'], mp3['artist'], mp3['duration_ms'],
+            mp3,  # PASS FULL!
         )
+
+    def _do_search(self):  # NEW
+        results = self._search(self.mp3_meta)
         self.root.after(0, lambda: self.display_results(results))
         self.root.after(0, lambda: self.status.config(text=""))
 
@@ -199,14 +367,18 @@ class MP3MetadataApp:
 
     def display_results(self, results):
         self.apple_results = results
-        self.tree.delete(*self.tree.get_children())
         self.results_label.config(text=f"Found {len(results)} matches")
-        for r in results:
-            conf = r.get('confidence', 0)
-            iid = self.tree.insert('', 'end', values=(
-                conf, r['title'], r['artist'], r['album'], r['year'], r['duration']
-            ))
-            self.tree.item(iid, tags=('confidence',))
+        # Re-use existing rows instead of rebuilding the whole tree
+        self.tree.selection_remove(self.tree.selection())
+        iids = self.tree.get_children()
+        if len(iids) > len(results):
+            self.tree.delete(*iids[len(results):])
+        for i, r in enumerate(results):
+            values = (r.get('confidence', 0), r['title'], r['artist'], r['album'], r['year'], r['duration'])
+            if i < len(iids):
+                self.tree.item(iids[i], values=values)
+            else:
+                self.tree.insert('', 'end', values=values, tags=('confidence',))
 
     def on_select(self, _):
         sel = self.tree.selection()
@@ -256,6 +428,12 @@ class MP3MetadataApp:
 
     def update(self):
         if update_mp3_metadata(self.mp3_meta['file_path'], self.selected_apple):
+            if self.library_index is not None:
+                self.library_index.record(BatchResult(
+                    self.mp3_meta['file_path'], 'updated',
+                    self.selected_apple.get('confidence'), self.selected_apple,
+                ))
+                self.library_index.flush()
             messagebox.showinfo("Success", "Metadata updated!")
 
             # --- Clear everything ---
@@ -285,48 +463,109 @@ class MP3MetadataApp:
         self.process_file()
 
     def batch_process(self):
-        if not self.file_list:
+        if not self.file_list and not self.scanning():
             messagebox.showerror("Error", "No files selected.")
             return
         self.batch_frame.pack(fill="both", expand=True, pady=10)
-        self.batch_tree.delete(*self.batch_tree.get_children())
+        self.batch_list.clear()
+        self.batch_progress.config(value=0)
+        self._batch = None
         self.status.config(text="Batch processing…")
-        threading.Thread(target=self.run_batch, daemon=True).start()
-
-    def run_batch(self):
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as exe:
-            futures = {exe.submit(self.batch_one, p): p for p in self.file_list}
-            for f in concurrent.futures.as_completed(futures):
-                path, status = f.result()
-                self.root.after(0, lambda p=path, s=status: self.batch_tree.insert(
-                    '', 'end', values=(os.path.basename(p), s)))
-        self.root.after(0, lambda: self.status.config(text="Batch complete!"))
-
-    def batch_one(self, path):
+        journal = self.open_journal()
+        # Batch can start while the folder is still being scanned
+        paths = self._follow_scan(self.scan_done, self.file_list) if self.scanning() else list(self.file_list)
+        threading.Thread(target=self.run_batch, args=(journal, paths), daemon=True).start()
+        self.root.after(UI_TICK_MS, self._drain_ui_queue)
+
+    def open_journal(self):
+        """
+        Checkpoint journal for this folder's batches (one per folder, so
+        another folder's batch never discards it); offers to resume an
+        unfinished one
+        """
+        if self.selected_root is None:
+            return None
         try:
-            mp3 = read_mp3_metadata(path)
-            results = search_apple_music(
-                mp3['title'], 
-                mp3['artist'], 
-                mp3['duration_ms'], 
-                mp3  # ← Pass full metadata
-            )
-            if not results:
-                return path, "No match"
-
-            best = results[0]
-            score, _ = calculate_confidence(mp3, best)
-            if score >= 85:
-                ok = update_mp3_metadata(path, best)
-                return path, f"Updated ({score}%)" if ok else "Failed"
-            else:
-                return path, f"Skipped ({score}%)"
+            journal = BatchJournal(journal_path_for(self.selected_root))
         except Exception as e:
-            debug_log(f"Batch error {path}: {e}")
-            return path, "Error"
+            debug_log(f"Batch journal disabled: {e}")
+            return None
+        journal.load()
+        pending = set(self.file_list)
+        done = sum(1 for p in journal.completed if p in pending)
+        if done and not messagebox.askyesno(
+                "Resume batch", f"{done} of these files were finished by an interrupted batch. Skip them?"):
+            journal.clear()
+        return journal
+
+    def run_batch(self, journal=None, paths=None):
+        """Worker thread: results go to ui_queue, never straight to Tk"""
+        METRICS.reset()
+        pipeline = BatchPipeline(cache=self.search_cache, index=self.library_index, catalog=self.catalog,
+                                 albums=AlbumMatcher(self.search_cache, catalog=self.catalog), journal=journal)
+        paths = paths if paths is not None else list(self.file_list)
+        files = self.file_list
+        self._batch = {
+            'pipeline': pipeline,
+            'started': time.monotonic(),
+            'total': (lambda n=len(paths): n) if isinstance(paths, list) else (lambda: len(files)),
+        }
+        for result in pipeline.run(paths):
+            self.ui_queue.put(('row', (os.path.basename(result['path']), format_status(result))))
+        if journal is not None:
+            journal.clear()  # finished: nothing left to resume
+            journal.close()
+        debug_log(f"Batch timings:\n{METRICS.format_summary()}")
+        skipped = pipeline.unchanged + pipeline.resumed
+        done = f"Batch complete! ({skipped} unchanged or already done skipped)" if skipped else "Batch complete!"
+        self.ui_queue.put(('done', done))
+
+    def _drain_ui_queue(self):
+        """Tk tick: apply every queued batch update in one frame"""
+        rows, done = [], None
+        try:
+            for _ in range(MAX_UPDATES_PER_TICK):
+                kind, payload = self.ui_queue.get_nowait()
+                if kind == 'row':
+                    rows.append(payload)
+                elif kind == 'done':
+                    done = payload
+        except queue.Empty:
+            pass
+        if rows:
+            self.batch_list.extend(rows)
+        self._show_batch_progress(finished=done is not None)
+        if done is not None:
+            self.status.config(text=done)
+        else:
+            self.root.after(UI_TICK_MS, self._drain_ui_queue)
+
+    def _show_batch_progress(self, finished=False):
+        if self._batch is None:
+            return  # worker thread has not started yet
+        pipeline = self._batch['pipeline']
+        completed = len(self.batch_list) + pipeline.unchanged + pipeline.resumed
+        total = max(self._batch['total'](), completed)
+        elapsed = time.monotonic() - self._batch['started']
+        rate = completed / elapsed if elapsed > 0 else 0.0
+        self.batch_progress.config(maximum=max(total, 1), value=completed)
+        if finished:
+            eta = "done"
+        elif rate and not self.scanning():
+            remaining = int((total - completed) / rate)
+            eta = f"ETA {remaining // 60}:{remaining % 60:02d}"
+        else:
+            eta = "ETA …"
+        more = "+" if self.scanning() else ""
+        self.batch_rate.config(text=f"{completed}/{total}{more} files · {rate:.1f}/s · {eta}")
+        if not finished:
+            self.status.config(text=f"Batch: {pipeline.format_stats()}")
 
     def reset(self):
+        self.stop_scan()
+        self.prefetcher.cancel()
         self.file_list = []
+        self.selected_root = None
         self.current_idx = 0
         self.mp3_meta = None
         self.apple_results = []
@@ -338,6 +577,7 @@ class MP3MetadataApp:
         self.compare_frame.pack_forget()
         self.action_frame.pack_forget()
         self.batch_frame.pack_forget()
+        self.batch_list.clear()
         for w in self.compare_frame.winfo_children():
             w.destroy()
         for w in self.action_frame.winfo_children():
@@ -1,27 +1,42 @@
 # ui/components.py
 import tkinter as tk
+import tkinter.font as tkfont
 from tkinter import ttk
-from PIL import Image, ImageTk
-from io import BytesIO
-import requests
 import threading
+from utils.helpers import debug_log
+from metadata.mp3_reader import get_cover_art
+from ui.thumbnails import get_thumbnail_cache
 
 def create_metadata_panel(parent, title, bg_color="#f8f9ff"):
     frame = tk.LabelFrame(parent, text=title, bg=bg_color, fg="#667eea",
                           font=("Arial", 14, "bold"), padx=10, pady=10)
     return frame
 
+def show_thumbnail(parent, digest, **pack):
+    """Main thread: show a cached thumbnail in `parent` (if it still exists)"""
+    if not parent.winfo_exists():
+        return  # panel was redrawn while the artwork loaded
+    photo = get_thumbnail_cache().photo(digest)
+    lbl = tk.Label(parent, image=photo, bg="#f8f9ff")
+    lbl.image = photo
+    lbl.pack(**pack)
+
 def load_artwork_async(parent, url):
+    thumbs = get_thumbnail_cache()
+    digest = thumbs.cached_url(url)
+    if digest is not None:
+        show_thumbnail(parent, digest, pady=8)
+        return
+
+    # Download and decode off the main thread; widgets are only created on it
     def fetch():
         try:
-            resp = requests.get(url, timeout=8)
-            img = Image.open(BytesIO(resp.content)).resize((200, 200), Image.Resampling.LANCZOS)
-            photo = ImageTk.PhotoImage(img)
-            lbl = tk.Label(parent, image=photo, bg="#f8f9ff")
-            lbl.image = photo
-            lbl.pack(pady=8)
-        except Exception:
-            tk.Label(parent, text="(No image)", fg="gray").pack(pady=8)
+            digest, _ = thumbs.from_url(url, timeout=8)
+            parent.after(0, lambda: show_thumbnail(parent, digest, pady=8))
+        except Exception as e:
+            debug_log(f"Artwork load failed: {e}")
+            parent.after(0, lambda: parent.winfo_exists() and tk.Label(
+                parent, text="(No image)", fg="gray").pack(pady=8))
     threading.Thread(target=fetch, daemon=True).start()
 
 def add_metadata_fields(parent, metadata, is_apple, mismatches=None):
@@ -44,7 +59,7 @@ def add_metadata_fields(parent, metadata, is_apple, mismatches=None):
         tk.Label(row, text=str(value), font=("Arial", 9), bg=bg, fg="gray").pack(side="left", padx=5)
 
     # === ARTWORK ===
-    art_data = metadata.get('cover_art_data') if not is_apple else None
+    art_data = get_cover_art(metadata) if not is_apple else None
     art_url = metadata.get('album_art_url') if is_apple else None
 
     artwork_frame = tk.Frame(parent, bg="#f8f9ff")
@@ -53,16 +68,9 @@ def add_metadata_fields(parent, metadata, is_apple, mismatches=None):
     if not is_apple and art_data:
         # --- MP3: Show embedded cover ---
         try:
-            img = Image.open(BytesIO(art_data))
-            # Validate image
-            img.verify()
-            img = Image.open(BytesIO(art_data))  # Re-open after verify
-            img = img.convert("RGB")
-            img = img.resize((200, 200), Image.Resampling.LANCZOS)
-            photo = ImageTk.PhotoImage(img)
-            lbl = tk.Label(artwork_frame, image=photo, bg="#f8f9ff")
-            lbl.image = photo
-            lbl.pack()
+            # One draft-mode decode, which also validates; cached by content hash
+            digest, _ = get_thumbnail_cache().from_bytes(art_data)
+            show_thumbnail(artwork_frame, digest)
         except Exception as e:
             debug_log(f"Failed to load MP3 cover art: {e}")
             tk.Label(artwork_frame, text="(Corrupted image)", fg="red", font=("Arial", 9)).pack()
@@ -80,4 +88,110 @@ def add_confidence_badge(parent, score):
     text = f"{score}% Match"
     badge = tk.Label(parent, text=text, bg=color, fg="white", font=("Arial", 9, "bold"), padx=6, pady=2)
     badge.pack(anchor="e", pady=2)
-    return badge
\ No newline at end of file
+    return badge
+
+class VirtualList(tk.Frame):
+    """
+    Read-only multi-column list that only draws the rows in view.
+
+    Rows live in a plain Python list; the canvas holds one text item per
+    visible cell and re-labels them on scroll, so 50k rows cost the same
+    to display as 30. New rows keep the view pinned to the bottom unless
+    the user has scrolled up.
+    """
+
+    def __init__(self, parent, columns, widths, row_height=20, font=("Arial", 9)):
+        super().__init__(parent, bg="white")
+        self.columns = columns
+        self.widths = widths
+        self.row_height = row_height
+        self.font = tkfont.Font(font=font)
+        self.rows = []
+        self.top = 0
+        self.follow = True
+        self._cells = []  # one list of canvas text ids per visible row
+        char_w = max(1, self.font.measure('0'))
+        self._max_chars = [max(4, (w - 10) // char_w) for w in widths]
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        header = tk.Canvas(self, height=row_height + 4, bg="#eef0fb", highlightthickness=0)
+        header.pack(fill="x")
+        x = 5
+        for name, w in zip(columns, widths):
+            header.create_text(x, (row_height + 4) // 2, text=name, anchor="w", font=("Arial", 9, "bold"))
+            x += w
+        self.canvas = tk.Canvas(self, bg="white", highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+
+        self.canvas.bind("<Configure>", self._layout)
+        for widget in (self.canvas, header):
+            widget.bind("<MouseWheel>", self._on_wheel)
+            widget.bind("<Button-4>", self._on_wheel)
+            widget.bind("<Button-5>", self._on_wheel)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _visible(self):
+        return max(1, self.canvas.winfo_height() // self.row_height)
+
+    def _layout(self, _event=None):
+        """Create or drop canvas rows so exactly one screenful exists"""
+        want = self._visible() + 1
+        while len(self._cells) < want:
+            y = len(self._cells) * self.row_height + self.row_height // 2
+            x, ids = 5, []
+            for w in self.widths:
+                ids.append(self.canvas.create_text(x, y, text="", anchor="w", font=self.font))
+                x += w
+            self._cells.append(ids)
+        while len(self._cells) > want:
+            for item in self._cells.pop():
+                self.canvas.delete(item)
+        self._scroll_to(self.top)
+
+    def _clip(self, value, col):
+        text = str(value)
+        n = self._max_chars[col]
+        return text if len(text) <= n else text[:n - 1] + "…"
+
+    def _redraw(self):
+        for i, ids in enumerate(self._cells):
+            idx = self.top + i
+            values = self.rows[idx] if idx < len(self.rows) else ()
+            for col, item in enumerate(ids):
+                self.canvas.itemconfigure(item, text=self._clip(values[col], col) if col < len(values) else "")
+        total, visible = len(self.rows), self._visible()
+        if total <= visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + visible) / total))
+
+    def _scroll_to(self, top):
+        last = max(0, len(self.rows) - self._visible())
+        self.top = max(0, min(top, last))
+        self.follow = self.top == last
+        self._redraw()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * len(self.rows)))
+        elif action == "scroll":
+            step = self._visible() if unit == "pages" else 1
+            self._scroll_to(self.top + int(amount) * step)
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self._scroll_to(self.top + (-3 if up else 3))
+
+    def extend(self, rows):
+        """Append many rows with a single redraw"""
+        self.rows.extend(rows)
+        self._scroll_to(len(self.rows) if self.follow else self.top)
+
+    def clear(self):
+        self.rows = []
+        self.top = 0
+        self.follow = True
+        self._redraw()
@@ -0,0 +1,65 @@
+# ui/prefetch.py
+import concurrent.futures
+import threading
+from utils.helpers import debug_log
+
+PREFETCH_WINDOW = 3
+
+
+class Prefetcher:
+    """
+    Bounded look-ahead for folder review.
+
+    schedule() keeps `load(path, cancelled)` running or finished for at
+    most `window` upcoming paths; anything that falls out of the window is
+    cancelled and forgotten, so memory stays bounded however long the
+    folder is. `load` should check `cancelled()` between steps and may
+    return None when it fires. take() hands over a path's Future (pending
+    or done) so the caller never repeats work that is already under way.
+    """
+
+    def __init__(self, load, window=PREFETCH_WINDOW, workers=2):
+        self.load = load
+        self.window = window
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers),
+                                                           thread_name_prefix='prefetch')
+        self._lock = threading.Lock()
+        self._jobs = {}  # path -> (Future, cancel Event)
+
+    def schedule(self, paths):
+        """Prefetch the first `window` of `paths`, dropping everything else"""
+        wanted = list(paths)[:self.window] if self.window > 0 else []
+        with self._lock:
+            for path in [p for p in self._jobs if p not in wanted]:
+                self._drop(path)
+            for path in wanted:
+                if path not in self._jobs:
+                    cancelled = threading.Event()
+                    future = self._pool.submit(self._run, path, cancelled)
+                    self._jobs[path] = (future, cancelled)
+
+    def _run(self, path, cancelled):
+        if cancelled.is_set():
+            return None
+        try:
+            return self.load(path, cancelled.is_set)
+        except Exception as e:
+            debug_log(f"Prefetch failed for {path}: {e}")
+            raise
+
+    def _drop(self, path):
+        future, cancelled = self._jobs.pop(path)
+        cancelled.set()
+        future.cancel()
+
+    def take(self, path):
+        """The Future for `path` if it was prefetched (and forget it), else None"""
+        with self._lock:
+            job = self._jobs.pop(path, None)
+        return job[0] if job else None
+
+    def cancel(self):
+        """Drop every prefetch, e.g. when the user jumps elsewhere or resets"""
+        with self._lock:
+            for path in list(self._jobs):
+                self._drop(path)
@@ -0,0 +1,120 @@
+# ui/thumbnails.py
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image, ImageTk
+
+from metadata.artwork_cache import content_hash, get_artwork_cache
+
+THUMBNAIL_SIZE = (200, 200)
+
+
+def make_thumbnail(data, size=THUMBNAIL_SIZE):
+    """
+    Decode image bytes straight to a `size` RGB thumbnail.
+
+    JPEGs are decoded in draft mode (the decoder scales by 1/2, 1/4 or 1/8
+    while decoding), other formats are box-reduced before the final LANCZOS
+    pass, so a 600x600+ cover is never fully decoded just to be shrunk.
+    Raises on corrupt data, which doubles as validation.
+    """
+    img = Image.open(BytesIO(data))
+    if img.format == 'JPEG':
+        img.draft('RGB', size)
+    img = img.convert('RGB')
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+
+class ThumbnailCache:
+    """
+    LRU of ready-to-display thumbnails keyed by content hash, with URLs
+    mapped to the hash of their content.
+
+    Thumbnails (PIL images) can be built from any thread; photo() wraps
+    them in a Tk PhotoImage and must be called on the Tk main thread.
+    """
+
+    def __init__(self, max_items=256, size=THUMBNAIL_SIZE):
+        self.max_items = max_items
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._thumbs = OrderedDict()  # hash -> PIL image
+        self._photos = {}  # hash -> PhotoImage, dropped with the thumbnail
+        self._urls = {}  # url -> hash
+
+    def _lookup(self, digest):
+        with self._lock:
+            img = self._thumbs.get(digest)
+            if img is not None:
+                self._thumbs.move_to_end(digest)
+                self.hits += 1
+            return img
+
+    def _store(self, digest, img):
+        with self._lock:
+            self._thumbs[digest] = img
+            while len(self._thumbs) > self.max_items:
+                old, _ = self._thumbs.popitem(last=False)
+                self._photos.pop(old, None)
+
+    def from_bytes(self, data):
+        """Return (hash, thumbnail) for image bytes, decoding only on a miss"""
+        digest = content_hash(data)
+        img = self._lookup(digest)
+        if img is None:
+            with self._lock:
+                self.misses += 1
+            img = make_thumbnail(data, self.size)
+            self._store(digest, img)
+        return digest, img
+
+    def cached_url(self, url):
+        """The hash of an already prepared thumbnail for `url`, or None"""
+        with self._lock:
+            digest = self._urls.get(url)
+        return digest if digest is not None and self._lookup(digest) is not None else None
+
+    def from_url(self, url, timeout=10):
+        """Return (hash, thumbnail) for artwork at `url`; blocking on a miss"""
+        with self._lock:
+            digest = self._urls.get(url)
+        img = self._lookup(digest) if digest is not None else None
+        if img is not None:
+            return digest, img
+        digest, img = self.from_bytes(get_artwork_cache().get(url, timeout=timeout))
+        with self._lock:
+            self._urls[url] = digest
+        return digest, img
+
+    def photo(self, digest):
+        """Tk main thread only: the PhotoImage for a cached thumbnail"""
+        photo = self._photos.get(digest)
+        if photo is None:
+            with self._lock:
+                img = self._thumbs.get(digest)
+            if img is None:
+                return None
+            photo = ImageTk.PhotoImage(img)
+            with self._lock:
+                self._photos[digest] = photo
+        return photo
+
+    def stats(self):
+        with self._lock:
+            return {'items': len(self._thumbs), 'hits': self.hits, 'misses': self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache():
+    """Return the process-wide thumbnail cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ThumbnailCache()
+        return _cache
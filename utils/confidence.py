@@ -1,18 +1,41 @@
 # utils/confidence.py
 import difflib
+from functools import lru_cache
+from utils import helpers
 from utils.helpers import debug_log
 
+# Bump when a change alters scores for the same inputs
+SCORING_VERSION = 1
+
+WEIGHTS = {
+    'duration': 0.40,
+    'title': 0.30,
+    'artist': 0.20,
+    'album': 0.10
+}
+
+@lru_cache(maxsize=65536)
+def _normalize(s):
+    return s.lower().strip().replace(" - remastered", "").replace(" (remaster)", "")
+
 def normalize(s):
     """Lowercase, strip, remove common noise"""
     if not s:
         return ""
-    return s.lower().strip().replace(" - remastered", "").replace(" (remaster)", "")
+    return _normalize(s)
+
+@lru_cache(maxsize=65536)
+def _ratio(a_norm, b_norm):
+    """difflib ratio as 0–100, with exact shortcuts for the common cases"""
+    if a_norm == b_norm:
+        return 100
+    if not a_norm or not b_norm:
+        return 0
+    return int(difflib.SequenceMatcher(None, a_norm, b_norm).ratio() * 100)
 
 def string_similarity(a, b):
     """Return 0–100 similarity score using difflib"""
-    a_norm = normalize(a)
-    b_norm = normalize(b)
-    return int(difflib.SequenceMatcher(None, a_norm, b_norm).ratio() * 100)
+    return _ratio(normalize(a), normalize(b))
 
 def duration_match(mp3_ms, apple_ms, tolerance_ms=5000):
     """Return 0–100 score based on duration diff"""
@@ -26,17 +49,13 @@ def duration_match(mp3_ms, apple_ms, tolerance_ms=5000):
     else:
         return 0
 
+def _total(scores):
+    return round(sum(scores[k] * WEIGHTS[k] for k in WEIGHTS))
+
 def calculate_confidence(mp3_meta, apple_meta):
     """
     Returns: (score: int 0–100, breakdown: dict)
     """
-    weights = {
-        'duration': 0.40,
-        'title': 0.30,
-        'artist': 0.20,
-        'album': 0.10
-    }
-
     scores = {
         'duration': duration_match(mp3_meta['duration_ms'], apple_meta['duration_ms']),
         'title': string_similarity(mp3_meta['title'], apple_meta['title']),
@@ -44,10 +63,50 @@ def calculate_confidence(mp3_meta, apple_meta):
         'album': string_similarity(mp3_meta['album'], apple_meta['album'])
     }
 
-    total_score = sum(scores[k] * weights[k] for k in weights)
-    total_score = round(total_score)
+    total_score = _total(scores)
+
+    if helpers.DEBUG:
+        debug_log("Confidence breakdown", scores)
+        debug_log(f"Final confidence: {total_score}%")
+
+    return total_score, scores
+
+def score_candidates(mp3_meta, candidates, threshold=None):
+    """
+    Score every candidate against one MP3 record.
+
+    Returns a list parallel to `candidates` of (score, breakdown) tuples,
+    identical to calculate_confidence. With a `threshold`, a candidate is
+    dropped as (None, None) as soon as its best possible score falls below
+    it: the duration score is checked first, then each string field in
+    weight order. When no candidate reaches the threshold, the dropped ones
+    are scored again against the best score so far instead, so the best one (the first of
+    any ties) still gets its real score and the caller can report how
+    close it came.
+    """
+    mp3_ms = mp3_meta['duration_ms']
+    mine = (('title', normalize(mp3_meta['title'])), ('artist', normalize(mp3_meta['artist'])),
+            ('album', normalize(mp3_meta['album'])))
 
-    debug_log("Confidence breakdown", scores)
-    debug_log(f"Final confidence: {total_score}%")
+    def score(apple, bar):
+        scores = {'duration': duration_match(mp3_ms, apple['duration_ms'])}
+        # Best case for the remaining fields is 100 each
+        remaining = 100 * (WEIGHTS['title'] + WEIGHTS['artist'] + WEIGHTS['album'])
+        bound = scores['duration'] * WEIGHTS['duration'] + remaining
+        for field, text in mine:
+            if bar is not None and round(bound) < bar:
+                return None, None
+            scores[field] = _ratio(text, normalize(apple[field]))
+            bound -= (100 - scores[field]) * WEIGHTS[field]
+        return _total(scores), scores
 
-    return total_score, scores
\ No newline at end of file
+    out = [score(apple, threshold) for apple in candidates]
+    if threshold is not None and not any(total is not None and total >= threshold for total, _ in out):
+        best = None
+        for i, apple in enumerate(candidates):
+            if out[i][0] is None:
+                # A later candidate has to beat the best outright; ties keep the earlier one
+                out[i] = score(apple, None if best is None else best + 1)
+            if out[i][0] is not None and (best is None or out[i][0] > best):
+                best = out[i][0]
+    return out
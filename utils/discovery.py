@@ -0,0 +1,118 @@
+# utils/discovery.py
+import concurrent.futures
+import fnmatch
+import os
+import threading
+from utils.helpers import debug_log
+
+DEFAULT_INCLUDE = ('*.mp3',)
+
+
+def _matches(name, patterns):
+    name = name.lower()
+    return any(fnmatch.fnmatchcase(name, p) for p in patterns)
+
+
+class Discovery:
+    """
+    Streaming file discovery over one or more roots.
+
+    Iterating yields matching file paths as directories are scanned
+    (os.scandir, no full listing up front). `include` globs match file
+    names, `exclude` globs match file or directory names and prune whole
+    subtrees; both are case-insensitive. Directories are tracked by
+    (st_dev, st_ino) so symlink loops and duplicate mounts are entered
+    once. With workers > 1, subdirectories are scanned in parallel and
+    files arrive in completion order. `found` counts yielded files.
+    """
+
+    def __init__(self, roots, include=DEFAULT_INCLUDE, exclude=(), workers=1, follow_symlinks=True):
+        self.roots = [roots] if isinstance(roots, str) else list(roots)
+        self.include = tuple(p.lower() for p in include)
+        self.exclude = tuple(p.lower() for p in exclude)
+        self.workers = max(1, workers)
+        self.follow_symlinks = follow_symlinks
+        self.found = 0
+        self.dirs = 0
+        self._seen = set()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _excluded(self, entry_name, path):
+        return self.exclude and (_matches(entry_name, self.exclude) or _matches(path, self.exclude))
+
+    def _enter(self, path, st=None):
+        """True the first time a directory (by device/inode) is seen"""
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return False
+        key = (st.st_dev, st.st_ino)
+        if key in self._seen:
+            debug_log('Discovery: skipping already visited directory', path)
+            return False
+        self._seen.add(key)
+        return True
+
+    def _scan(self, path):
+        """List one directory: (matching files, [(subdir, stat)]), both sorted"""
+        files, subdirs = [], []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if self._excluded(entry.name, entry.path):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                            subdirs.append((entry.path, entry.stat(follow_symlinks=True)))
+                        elif entry.is_file() and _matches(entry.name, self.include):
+                            files.append(entry.path)
+                    except OSError as e:
+                        debug_log(f'Discovery: cannot stat {entry.path}: {e}')
+        except OSError as e:
+            debug_log(f'Discovery: cannot list {path}: {e}')
+        files.sort()
+        subdirs.sort()
+        return files, subdirs
+
+    def __iter__(self):
+        for root in self.roots:
+            if self._cancel.is_set():
+                return
+            if os.path.isfile(root):
+                self.found += 1
+                yield root
+            elif self._enter(root):
+                yield from (self._walk_parallel(root) if self.workers > 1 else self._walk(root))
+
+    def _walk(self, root):
+        stack = [root]
+        while stack and not self._cancel.is_set():
+            files, subdirs = self._scan(stack.pop())
+            self.dirs += 1
+            for path in files:
+                self.found += 1
+                yield path
+            # Reversed so the stack pops subdirectories in name order
+            stack.extend(p for p, st in reversed(subdirs) if self._enter(p, st))
+
+    def _walk_parallel(self, root):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {pool.submit(self._scan, root)}
+            try:
+                while pending and not self._cancel.is_set():
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for f in done:
+                        files, subdirs = f.result()
+                        self.dirs += 1
+                        # Dedup happens here, on the consuming thread only
+                        pending |= {pool.submit(self._scan, p) for p, st in subdirs if self._enter(p, st)}
+                        for path in files:
+                            self.found += 1
+                            yield path
+            finally:
+                for f in pending:
+                    f.cancel()
@@ -1,14 +1,17 @@
 # utils/helpers.py
 import os
+import sys
 from datetime import datetime
 
-DEBUG = True
+# Off unless asked for; set MP3_METADATA_DEBUG=1 (or --debug on the CLI)
+DEBUG = os.environ.get('MP3_METADATA_DEBUG', '') not in ('', '0')
 
 def debug_log(message, data=None):
+    """Debug output to stderr. Hot paths should check DEBUG before building the message."""
     if DEBUG:
-        print(f"[DEBUG] {message}")
+        print(f"[DEBUG] {message}", file=sys.stderr)
         if data:
-            print(data)
+            print(data, file=sys.stderr)
 
 def format_duration(ms):
     if not ms:
@@ -0,0 +1,184 @@
+# utils/http_client.py
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from utils.helpers import debug_log
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# requests per second, burst size
+DEFAULT_HOST_RATES = {
+    'itunes.apple.com': (20 / 60, 5),  # Apple documents roughly 20 calls/minute
+}
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, at most `capacity` banked"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HttpClient:
+    """
+    Pooled keep-alive HTTP client shared by all network I/O.
+
+    Requests are throttled per host with a token bucket and retried with
+    jittered exponential backoff on connection errors and retryable statuses.
+    """
+
+    def __init__(self, pool_size=16, max_retries=4, backoff_base=0.5, backoff_max=30.0,
+                 host_rates=None, retry_statuses=RETRY_STATUSES):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = tuple(retry_statuses)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._host_rates = dict(DEFAULT_HOST_RATES if host_rates is None else host_rates)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def set_host_rate(self, host, rate, burst=1):
+        """Limit `host` to `rate` requests/second (None removes the limit)"""
+        with self._lock:
+            if rate is None:
+                self._host_rates.pop(host, None)
+            else:
+                self._host_rates[host] = (rate, burst)
+            self._buckets.pop(host, None)
+
+    def _bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                limit = self._host_rates.get(host)
+                self._buckets[host] = TokenBucket(*limit) if limit else None
+            return self._buckets[host]
+
+    def _backoff(self, attempt, resp=None):
+        retry_after = resp.headers.get('Retry-After') if resp is not None else None
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        # Full jitter: uniform over the exponential window
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url, timeout=10, retry_statuses=None, **kwargs):
+        """GET `url`, returning the final response. Raises on exhausted connection errors."""
+        host = urlsplit(url).hostname or ''
+        bucket = self._bucket(host)
+        statuses = self.retry_statuses if retry_statuses is None else tuple(retry_statuses)
+
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            start = time.perf_counter()
+            try:
+                resp = self.session.get(url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(host, time.perf_counter() - start, error=True)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                debug_log(f'HTTP {host} failed ({e}); retry {attempt + 1} in {delay:.2f}s')
+            else:
+                self._record(host, time.perf_counter() - start, error=resp.status_code >= 400)
+                if resp.status_code not in statuses or attempt >= self.max_retries:
+                    return resp
+                delay = self._backoff(attempt, resp)
+                debug_log(f'HTTP {host} returned {resp.status_code}; retry {attempt + 1} in {delay:.2f}s')
+            self._record_retry(host)
+            time.sleep(delay)
+            attempt += 1
+
+    def _host_stats(self, host):
+        if host not in self._stats:
+            self._stats[host] = {
+                'requests': 0, 'errors': 0, 'retries': 0,
+                'total_s': 0.0, 'max_s': 0.0, 'recent': deque(maxlen=1000),
+            }
+        return self._stats[host]
+
+    def _record(self, host, elapsed, error=False):
+        with self._lock:
+            s = self._host_stats(host)
+            s['requests'] += 1
+            s['errors'] += int(error)
+            s['total_s'] += elapsed
+            s['max_s'] = max(s['max_s'], elapsed)
+            s['recent'].append(elapsed)
+
+    def _record_retry(self, host):
+        with self._lock:
+            self._host_stats(host)['retries'] += 1
+
+    def stats(self):
+        """Per-host request counts and latency summary (seconds)"""
+        out = {}
+        with self._lock:
+            for host, s in self._stats.items():
+                recent = sorted(s['recent'])
+                out[host] = {
+                    'requests': s['requests'],
+                    'errors': s['errors'],
+                    'retries': s['retries'],
+                    'mean_s': round(s['total_s'] / s['requests'], 4) if s['requests'] else 0.0,
+                    'p95_s': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 4) if recent else 0.0,
+                    'max_s': round(s['max_s'], 4),
+                }
+        return out
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the process-wide shared client, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def set_http_client(client):
+    """Swap the shared client (e.g. one pointed at a local stub server)"""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,175 @@
+# utils/metrics.py
+import bisect
+import json
+import os
+import threading
+import time
+
+# Latency buckets (seconds), Prometheus-style upper bounds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROMETHEUS_PREFIX = 'mp3_metadata_cleaner'
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; quantiles are estimated from the buckets"""
+
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (capped at the observed max)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_s': round(self.sum, 4),
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.5) * 1000, 3),
+            'p95_ms': round(self.quantile(0.95) * 1000, 3),
+            'p99_ms': round(self.quantile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    Process-wide counters and latency histograms.
+
+    Recording is a perf_counter pair plus a short locked update; with
+    `enabled` off, timer() hands back a shared no-op and inc()/observe()
+    return immediately.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._started = time.time()
+
+    def inc(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            h = self._histograms.get(name)
+            if h is None:
+                h = self._histograms[name] = Histogram()
+            h.observe(seconds)
+
+    def timer(self, name):
+        """Context manager recording the block's wall time under `name`"""
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+            self._started = time.time()
+
+    # ---- Export ----
+    def snapshot(self):
+        with self._lock:
+            return {
+                'elapsed_s': round(time.time() - self._started, 3),
+                'counters': dict(sorted(self._counters.items())),
+                'timers': {k: h.summary() for k, h in sorted(self._histograms.items())},
+            }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                metric = f'{PROMETHEUS_PREFIX}_{name}_total'
+                lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+            for name, h in sorted(self._histograms.items()):
+                metric = f'{PROMETHEUS_PREFIX}_{name}_seconds'
+                lines.append(f'# TYPE {metric} histogram')
+                cumulative = 0
+                for bound, n in zip(BUCKETS, h.counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {h.count}')
+                lines.append(f'{metric}_sum {h.sum:.6f}')
+                lines.append(f'{metric}_count {h.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write a node_exporter textfile atomically (temp file + rename)"""
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    def format_summary(self):
+        """Timers sorted by total time, one line each"""
+        timers = self.snapshot()['timers']
+        rows = sorted(timers.items(), key=lambda kv: kv[1]['total_s'], reverse=True)
+        return '\n'.join(
+            f"{name:<16} n={t['count']:<7} total={t['total_s']:.2f}s mean={t['mean_ms']:.2f}ms "
+            f"p95={t['p95_ms']:.2f}ms max={t['max_ms']:.2f}ms"
+            for name, t in rows
+        )
+
+
+METRICS = Metrics()